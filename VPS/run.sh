@@ -2,5 +2,11 @@ export GH_USERNAME="你的GitHub邮箱"
 export GH_PASSWORD="你的GitHub密码"
 export TG_BOT_TOKEN="消息通知的TG机器人 token"
 export TG_CHAT_ID="接收消息的TG账号id"
+export CLAW_STORAGE_STATE="state.json"  # 保存登录状态，调度器据此判断会话何时到期
+export CLAW_CLOUD_URL="https://eu-central-1.run.claw.cloud"  # 你的 ClawCloud 区域（控制台地址）
 
-python3 auto_login.py
+# 部署时 scripts/*.py 和本脚本在同一目录；仓库内直接运行时用 ../scripts 下的
+DIR="$(cd "$(dirname "$0")" && pwd)"
+SCRIPT="${1:-auto_login.py}"
+[ -f "$DIR/$SCRIPT" ] || SCRIPT="../scripts/$SCRIPT"
+python3 "$DIR/$SCRIPT"
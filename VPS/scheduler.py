@@ -1,74 +1,290 @@
-import time
-import random
-import os
-from datetime import datetime, timedelta
-from auto_login import AutoLogin  # 假设你的类名是 ClawAuto
-
-# 配置
-MIN_DAYS = 15
-MAX_DAYS = 25
-CHECK_INTERVAL = 3600  # 每小时检查一次
-STATE_FILE = "next_run_time.txt"
-
-def get_next_run():
-    """读取或生成下一次运行时间"""
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
-            try:
-                ts = float(f.read().strip())
-                return datetime.fromtimestamp(ts)
-            except:
-                pass
-    return None
-
-def save_next_run(next_time):
-    """保存下一次运行时间"""
-    with open(STATE_FILE, "w") as f:
-        f.write(str(next_time.timestamp()))
-
-def set_random_next_run():
-    """计算 15-25 天后的随机时间"""
-    days = random.randint(MIN_DAYS, MAX_DAYS)
-    hours = random.randint(0, 23)
-    minutes = random.randint(0, 59)
-    
-    next_time = datetime.now() + timedelta(days=days, hours=hours, minutes=minutes)
-    save_next_run(next_time)
-    print(f"📅 已排期下次执行时间: {next_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    return next_time
-
-def main():
-    print("🚀 Claw 自动化定时调度器启动...")
-    
-    while True:
-        next_run = get_next_run()
-        now = datetime.now()
-
-        # 如果没有记录，或者已经过了预定时间
-        if next_run is None or now >= next_run:
-            print(f"⏰ 到达执行时间: {now.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # --- 执行你的自动化脚本 ---
-            try:
-                app = ClawAuto()
-                app.run()
-                print("✅ 任务执行完毕")
-            except Exception as e:
-                print(f"❌ 任务执行出错: {e}")
-            
-            # 无论成功失败，都重新设定下一次时间点
-            next_run = set_random_next_run()
-            
-            # 发送 TG 通知（可选）
-            # app.tg.send(f"📅 任务已完成，下次执行约在: {next_run.strftime('%Y-%m-%d')}")
-
-        else:
-            # 还没到时间，显示倒计时
-            diff = next_run - now
-            print(f"💤 距离下次执行还有: {diff.days}天 {diff.seconds // 3600}小时 (预计: {next_run.strftime('%Y-%m-%d %H:%M:%S')})")
-            
-        # 等待一小时再次检查
-        time.sleep(CHECK_INTERVAL)
-
-if __name__ == "__main__":
-    main()
+import time
+import random
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+
+# 仓库内直接运行时复用 scripts/ 下的模块；部署时把 scripts/*.py 拷到同一目录即可
+_SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+if os.path.isdir(_SCRIPTS):
+    sys.path.insert(0, _SCRIPTS)
+
+# 只导入查计划 / 执行动作要用的模块；常驻循环才用到的在 main() 里导入（claw.py status 不用付这部分启动时间）
+import lease
+import policy
+import planner
+import metrics
+from clock import CLOCK
+from history import History
+
+# 配置
+CHECK_INTERVAL = 3600  # 最多每小时检查一次
+STATE_FILE = "next_run_time.txt"  # 各账号的下次执行计划（JSON）
+JITTER_HOURS = 6  # 在截止时间前随机提前 0-6 小时，避免每次卡同一时刻
+FAIL_RETRY_HOURS = 6  # 执行失败后多久重试
+SKIP_RETRY_MIN = 300  # 被跳过（近期已成功 / 租约被占）后最早多少秒再试
+
+
+def fmt(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def accounts():
+    """保险箱里的全部账号；没配保险箱则为环境变量里的单账号（记为空字符串）"""
+    if os.environ.get("CLAW_VAULT_KEY"):
+        from vault import Vault
+        return Vault().accounts()
+    return [""]
+
+
+def load_plans():
+    """读取执行计划 {账号: {action, at, reason}}"""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r") as f:
+            try:
+                plans = json.load(f)
+                if isinstance(plans, dict):
+                    return plans
+            except:
+                pass
+    return {}
+
+
+def save_plans(plans):
+    """保存执行计划"""
+    with open(STATE_FILE, "w") as f:
+        json.dump(plans, f, ensure_ascii=False, indent=2)
+
+
+def login(account, force=False):
+    """完整浏览器登录（浏览器槽位在 AutoLogin.run 里申请）；没有运行时返回 lease.Skipped"""
+    from auto_login import AutoLogin
+    try:
+        result = AutoLogin(account or None, force=force).run()
+        return result if isinstance(result, lease.Skipped) else True
+    except SystemExit as e:
+        return not e.code
+    except Exception as e:
+        print(f"❌ 任务执行出错: {e}")
+        return False
+
+
+def execute(account, action, coord=None, force=False, clock=CLOCK):
+    """
+    执行动作（在工作线程里），返回是否成功或 lease.Skipped
+    多节点时先拿执行租约，拿不到说明账号已交给别的节点或正在别处执行
+    """
+    if coord and not coord.claim(account):
+        import fleet
+
+        print(f"⏭️ {account or '账号'} 已由其它节点负责或正在执行，跳过")
+        metrics.inc("claw_runs_total", action=action, outcome="skipped")
+        return lease.Skipped(time.time() + fleet.NODE_TTL, "其它节点正在执行")
+    try:
+        ok = run_action(account, action, force, clock)
+        outcome = "skipped" if isinstance(ok, lease.Skipped) else "ok" if ok else "failed"
+        metrics.inc("claw_runs_total", action=action, outcome=outcome)
+        return ok
+    finally:
+        if coord:
+            coord.release(account)
+
+
+def run_action(account, action, force=False, clock=CLOCK):
+    """probe / api 失败就升级为完整登录"""
+    name = account or os.environ.get("GH_USERNAME", "")
+    if action in (policy.ACT_PROBE, policy.ACT_API):
+        started = clock.time()
+        try:
+            ok = (policy.probe if action == policy.ACT_PROBE else policy.api_keepalive)(account)
+        except Exception as e:
+            print(f"❌ {action} 出错: {e}")
+            ok = False
+        finished = clock.time()
+        metrics.observe("claw_stage_seconds", finished - started, stage=action)
+        history = History()  # sqlite 连接不跨线程
+        history.record(name, policy.REGION, ok, started, {action: finished - started}, path=action, finished=finished)
+        history.close()
+        if ok:
+            print(f"✅ {name or '账号'} {action} 成功")
+            return True
+        metrics.inc("claw_runs_total", action=action, outcome="escalated")
+        print(f"⚠️ {name or '账号'} {action} 失败，改为完整登录")
+    return login(account, force)
+
+
+def replan(account, plans, history, now):
+    """按策略更新某账号的计划；未到期的旧计划（含失败重试、错峰）保持不变，抖动才稳定"""
+    d = policy.decide(account, history, now)
+    p = plans.get(account)
+    if p and (p.get("retry") or p.get("spread") or (p["action"] == d.action and p["at"] <= d.at)):
+        return p
+    at = max(now, d.earliest, d.at - random.uniform(0, JITTER_HOURS * 3600)) if d.at > now else now
+    p = plans[account] = {"action": d.action, "at": at, "reason": d.reason}
+    print(f"📅 {account or '账号'}: {d.action} @ {fmt(at)}（{d.reason}）")
+    return p
+
+
+def command(cmd, arg, ctrl, plans, running, mine, history, coord, forced):
+    """处理一条 Telegram 控制命令（在调度线程里），返回回复内容；/run 的账号放进 forced"""
+    busy = set(running.values())
+    name = lambda a: a or os.environ.get("GH_USERNAME") or "账号"
+    if cmd == "run":
+        account = arg
+        if not arg and len(mine) == 1:
+            account = mine[0]
+        elif not arg:
+            return "用法: /run 账号\n" + "\n".join(name(a) for a in mine)
+        if account not in mine:
+            return f"❓ {arg} 不在本节点负责的账号里"
+        if account in busy or account in forced:
+            return f"⏳ {name(account)} 正在执行"
+        forced.append(account)
+        plans[account] = {"action": policy.ACT_LOGIN, "at": time.time(), "reason": "手动 /run"}
+        return f"▶️ 开始登录 {name(account)}"
+    if cmd == "pause":
+        ctrl.paused = True
+        return "⏸️ 已暂停定时执行（/run 仍可用），/resume 恢复"
+    if cmd == "resume":
+        ctrl.paused = False
+        return "▶️ 已恢复定时执行"
+    if cmd == "next":
+        lines = [f"{name(a)}: {p['action']} @ {fmt(p['at'])}（{p['reason']}）"
+                 for a, p in sorted(plans.items(), key=lambda x: x[1]["at"]) if a not in busy]
+        lines += [f"{name(a)}: 执行中" for a in sorted(busy)]
+        return ("⏸️ 定时执行已暂停\n" if ctrl.paused else "") + ("\n".join(lines) or "没有计划")
+    # status
+    lines = [f"{'⏸️ 已暂停' if ctrl.paused else '🟢 运行中'}，执行中 {len(busy)} 个"]
+    for a in mine:
+        # 单账号模式的计划键是 ""，运行记录却按 GH_USERNAME 记
+        last = history.last_success(a or os.environ.get("GH_USERNAME", ""))
+        state = "执行中" if a in busy else (f"最近成功 {fmt(last)}" if last else "暂无成功记录")
+        lines.append(f"{name(a)}: {state}")
+    if coord:
+        for node, alive, cap, n, nbusy in coord.status():
+            lines.append(f"{'🟢' if alive else '🔴'} {node} 账号 {n} 执行中 {nbusy}/{cap}")
+    return "\n".join(lines)
+
+
+def main(clock=CLOCK):
+    from concurrent.futures import ThreadPoolExecutor
+    import proxies
+    import fleet
+    import control
+
+    print("🚀 Claw 自动化定时调度器启动...")
+    if threading.current_thread() is threading.main_thread():
+        import signal
+
+        # systemd / docker stop 发的 SIGTERM 转成正常退出，atexit 里的 deleteWebhook 才会执行
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    history = History()
+    # 工作线程数 = 本机浏览器上限；probe / api 不开浏览器，但也不值得更多并发
+    pool = ThreadPoolExecutor(max_workers=planner.MAX_BROWSERS)
+    running = {}  # future -> 账号
+    wake = threading.Event()  # 有任务结束或收到控制命令时提前醒
+    proxies.ProxyPool().start()  # 配置了 CLAW_PROXIES 时后台探测代理健康和延迟
+    # CLAW_METRICS_LISTEN 配置后提供 /metrics、/healthz；调度循环超过一个检查周期没动就算不健康
+    metrics.serve(ttl=CHECK_INTERVAL + 600)
+    metrics.gauge("claw_browsers_max", planner.MAX_BROWSERS)
+    # 配置了 CLAW_FLEET_DB 时多台 VPS 分片执行，本节点只处理分给自己的账号
+    coord = None
+    if fleet.FLEET_DB:
+        coord = fleet.Coordinator(capacity=planner.MAX_BROWSERS)
+        coord.start()
+        print(f"🛰️ 多节点模式: {coord.node}（{fleet.FLEET_DB}）")
+    # 配置了 TG_BOT_TOKEN / TG_CHAT_ID 时接受 /run /status /next /pause /resume（CLAW_CONTROL=0 关闭）
+    ctrl = control.Control(wake=wake).start()
+
+    mine = []  # 本节点负责的账号
+    while True:
+        wake.clear()
+        plans = load_plans()
+
+        # 收尾已完成的任务
+        for fut in [f for f in running if f.done()]:
+            account = running.pop(fut)
+            p = plans.pop(account, {})
+            try:
+                result = fut.result()
+            except Exception as e:
+                # 执行租约 / 历史记录的 SQLite 出错（database is locked 等）也按失败处理，不能带崩调度循环
+                print(f"❌ {account or '账号'} 任务出错: {e}")
+                metrics.inc("claw_runs_total", action=p.get("action", "unknown"), outcome="failed")
+                result = False
+            if isinstance(result, lease.Skipped):
+                # 按跳过原因给的时间重排，不能让策略立刻又排一次（没有会话时会原地空转）
+                at = max(result.until, clock.time() + SKIP_RETRY_MIN)
+                plans[account] = dict(p, at=at, reason=result.reason, retry=True, spread=False)
+                print(f"📅 {account or '账号'} 本次跳过（{result.reason}），{fmt(at)} 再试")
+            elif result:
+                print(f"✅ 任务执行完毕 {account}")
+            else:
+                plans[account] = dict(p, at=clock.time() + FAIL_RETRY_HOURS * 3600, retry=True, spread=False)
+                print(f"📅 {account or '账号'} 执行失败，{FAIL_RETRY_HOURS} 小时后重试")
+
+        now = clock.time()
+        busy = set(running.values())
+        if coord:
+            try:
+                mine = coord.rebalance(accounts(), now)
+            except Exception as e:
+                print(f"⚠️ 分配账号失败，沿用上次的分配: {e}")
+        else:
+            mine = accounts()
+        for account in [a for a in plans if a not in mine and a not in busy]:
+            plans.pop(account)  # 已交给别的节点
+        due = []
+        for account in mine:
+            if account in busy:
+                continue
+            p = replan(account, plans, history, now)
+            if p["at"] <= now:
+                due.append(account)
+        if ctrl.paused:
+            due = []
+
+        forced = []
+        for cmd, arg in ctrl.take():
+            print(f"🎛️ 收到命令: /{cmd} {arg}")
+            ctrl.reply(command(cmd, arg, ctrl, plans, running, mine, history, coord, forced))
+        due = [a for a in due if a not in forced]
+
+        # 同时到期的新任务错峰：第一个立刻跑，其余摊到窗口里
+        fresh = [a for a in due if not plans[a].get("spread")]
+        if len(fresh) > 1:
+            for account, at in planner.spread(fresh, now).items():
+                plans[account].update(at=at, spread=True)
+            print(f"🔀 {len(fresh)} 个账号同时到期，错峰到 {planner.SPREAD_MINUTES:g} 分钟内执行")
+            due = [a for a in due if plans[a]["at"] <= now]
+
+        for account in due + forced:
+            p = plans[account]
+            print(f"⏰ 到达执行时间: {fmt(now)} {account or ''} {p['action']}（{p['reason']}）")
+            fut = pool.submit(execute, account, p["action"], coord, account in forced, clock)
+            fut.add_done_callback(lambda f: wake.set())
+            running[fut] = account
+
+        save_plans(plans)
+        metrics.gauge("claw_scheduler_last_loop_timestamp_seconds", time.time())
+        metrics.clear("claw_next_run_timestamp_seconds")
+        for account, p in plans.items():
+            metrics.gauge("claw_next_run_timestamp_seconds", p["at"], account=account or "default",
+                          action=p["action"])
+
+        # 睡到最近的计划时间（最多 CHECK_INTERVAL），有任务结束或收到控制命令就提前醒
+        busy = set(running.values())
+        pending = [p["at"] for a, p in plans.items() if a not in busy and not ctrl.paused]
+        nxt = min(pending, default=now + CHECK_INTERVAL)
+        # 多节点时至少每个节点超时周期醒一次，及时接手下线节点的账号
+        interval = min(CHECK_INTERVAL, fleet.NODE_TTL) if coord else CHECK_INTERVAL
+        timeout = min(interval, max(5, nxt - clock.time()))
+        if pending:
+            diff = int(max(0, nxt - clock.time()))
+            print(f"💤 距离下次执行还有: {diff // 86400}天 {diff % 86400 // 3600}小时 (预计: {fmt(nxt)})")
+        clock.wait(wake, timeout)
+
+if __name__ == "__main__":
+    main()
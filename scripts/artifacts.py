@@ -0,0 +1,97 @@
+"""
+截图存储：按内容寻址 + 每次运行一个目录 + 磁盘预算
+- 截图存成 JPEG（CLAW_SHOT_QUALITY），文件名为内容哈希：.claw/shots/blobs/ab/<sha256>.jpg
+  同一画面（例如两步验证页反复截图）只存一份
+- 每次运行的目录 .claw/shots/runs/<账号>/<时间>/ 下是指向 blob 的符号链接（NN_名称.jpg），方便按顺序查看
+- 全部 blob 超过 CLAW_SHOT_BUDGET_MB 时按最近使用时间淘汰，失效的链接和空目录一并清理；
+  一次运行预算（CLAW_RUN_BUDGET）内用过的 blob 不淘汰，免得删掉并发运行还要发送的截图
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import tempfile
+
+from timeouts import RUN_BUDGET
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+SHOT_DIR = os.environ.get("CLAW_SHOT_DIR", os.path.join(STATE_DIR, "shots"))
+SHOT_QUALITY = int(os.environ.get("CLAW_SHOT_QUALITY", "70"))
+SHOT_BUDGET_MB = float(os.environ.get("CLAW_SHOT_BUDGET_MB", "200"))
+
+
+class ShotStore:
+    """一次运行的截图"""
+
+    def __init__(self, account, root=SHOT_DIR, budget_mb=SHOT_BUDGET_MB, keep=RUN_BUDGET):
+        self.root = root
+        self.blobs = os.path.join(root, "blobs")
+        self.run = os.path.join(root, "runs", re.sub(r"[^\w.@-]", "_", account or "default"),
+                                time.strftime("%Y%m%d-%H%M%S"))
+        self.budget = budget_mb * 1024 * 1024
+        self.used = set()  # 本次运行引用的 blob，淘汰时跳过
+        self.keep = keep  # 最近 keep 秒内用过的 blob 也跳过（可能属于并发的另一次运行）
+
+    def put(self, data, name):
+        """存一张截图，返回 blob 路径（可直接发送 / 打开）"""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = os.path.join(self.blobs, digest[:2], f"{digest}.jpg")
+        if os.path.exists(blob):
+            os.utime(blob)  # 记为最近使用
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(blob), prefix=".shot-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, blob)
+        self.used.add(blob)
+
+        os.makedirs(self.run, exist_ok=True)
+        link = os.path.join(self.run, f"{name}.jpg")
+        try:
+            if os.path.lexists(link):
+                os.remove(link)
+            os.symlink(os.path.relpath(blob, self.run), link)
+        except OSError:
+            shutil.copyfile(blob, link)  # 不支持符号链接的文件系统
+        return blob
+
+    def prune(self):
+        """超出预算时按最近使用时间淘汰 blob，返回删除的数量"""
+        blobs = []
+        for d, _, files in os.walk(self.blobs):
+            for f in files:
+                p = os.path.join(d, f)
+                st = os.stat(p)
+                blobs.append((st.st_mtime, st.st_size, p))
+        total = sum(b[1] for b in blobs)
+        recent = time.time() - self.keep
+        removed = 0
+        for mtime, size, p in sorted(blobs):
+            if total <= self.budget or mtime >= recent:
+                break
+            if p in self.used:
+                continue
+            os.remove(p)
+            total -= size
+            removed += 1
+            try:
+                os.rmdir(os.path.dirname(p))
+            except OSError:
+                pass  # 目录里还有别的 blob
+        if removed:
+            self._sweep()
+        return removed
+
+    def _sweep(self):
+        """删除指向已淘汰 blob 的链接和空的运行目录"""
+        runs = os.path.join(self.root, "runs")
+        for d, _, files in os.walk(runs, topdown=False):
+            for f in files:
+                p = os.path.join(d, f)
+                if os.path.islink(p) and not os.path.exists(p):
+                    os.remove(p)
+            if d != runs and not os.listdir(d):
+                os.rmdir(d)
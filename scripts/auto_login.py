@@ -11,108 +11,277 @@ import sys
 import time
 import base64
 import re
-import requests
-from playwright.sync_api import sync_playwright
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from tracing import Capture
+from replay import HarMode, PLACEHOLDERS
+from vault import Vault, STORAGE_STATE, load_state, save_state
+from planner import BrowserSlots
+from timeouts import Timeouts, Deadline, DeadlineExceeded
+from proxies import ProxyPool, playwright_proxy, requests_proxies, mask
+import lease
+import tghook
+import tglimit
+import metrics
+from profiling import Profiler
+from traffic import Traffic
+from artifacts import ShotStore, SHOT_QUALITY
+import logsink
+from clock import CLOCK
+
+
+class PlaywrightTimeout(Exception):
+    """
+    占位：Playwright 在 login() 里才导入（跳过 / 排队退出的运行不用付导入时间），
+    导入后换成 playwright 的 TimeoutError；harness.py 的假页面抛的就是这个占位类
+    """
+
+
+def load_playwright():
+    """导入 Playwright，返回 sync_playwright"""
+    global PlaywrightTimeout
+    from playwright.sync_api import sync_playwright, TimeoutError
+    PlaywrightTimeout = TimeoutError
+    return sync_playwright
+
 
 # ==================== 配置 ====================
-CLAW_CLOUD_URL = "https://eu-central-1.run.claw.cloud"
+CLAW_CLOUD_URL = os.environ.get("CLAW_CLOUD_URL", "https://eu-central-1.run.claw.cloud")
 SIGNIN_URL = f"{CLAW_CLOUD_URL}/signin"
+REGION = urlparse(CLAW_CLOUD_URL).hostname.split(".")[0]  # eu-central-1
 DEVICE_VERIFY_WAIT = 30  # Mobile验证 默认等 30 秒
 TWO_FACTOR_WAIT = int(os.environ.get("TWO_FACTOR_WAIT", "120"))  # 2FA验证 默认等 120 秒
 
+# ==================== 页面状态 ====================
+ST_CLAW_SIGNIN = "claw_signin"          # ClawCloud 登录页
+ST_CLAW_CONSOLE = "claw_console"        # ClawCloud 控制台（终态）
+ST_GH_LOGIN = "github_login"            # GitHub 用户名/密码
+ST_GH_LOGIN_ERROR = "github_login_error"
+ST_DEVICE = "device_verify"             # 设备验证
+ST_2FA_MOBILE = "two_factor_mobile"     # GitHub Mobile 两步验证
+ST_2FA_CODE = "two_factor_code"         # TOTP/恢复码 两步验证
+ST_OAUTH = "oauth"                      # OAuth 授权
+ST_UNKNOWN = "unknown"
 
-class Telegram:
-    """Telegram 通知"""
+# URL 规则：按顺序匹配，先命中先返回（更具体的放前面）
+# 新增 GitHub 中间页：在这里加一条规则，再在 TRANSITIONS 里注册处理函数
+URL_RULES = [
+    (ST_OAUTH, lambda u: "github.com/login/oauth/authorize" in u),
+    (ST_DEVICE, lambda u: "verified-device" in u or "device-verification" in u),
+    (ST_2FA_MOBILE, lambda u: "two-factor/mobile" in u),
+    (ST_2FA_CODE, lambda u: "github.com/sessions/two-factor" in u),
+    (ST_GH_LOGIN, lambda u: "github.com/login" in u or "github.com/session" in u),
+    (ST_CLAW_SIGNIN, lambda u: "claw.cloud" in u and "signin" in u),
+    (ST_CLAW_CONSOLE, lambda u: "claw.cloud" in u),
+]
+
+# 页面规则：URL 分类后按页面元素细分 (URL 状态, selector, 细分状态)
+PAGE_RULES = [
+    (ST_GH_LOGIN, ".flash-error", ST_GH_LOGIN_ERROR),
+]
+
+# 状态 -> (处理方法, 失败原因)；处理方法返回 False 即终止流程
+TRANSITIONS = {
+    ST_CLAW_SIGNIN: ("open_github", "找不到 GitHub 按钮"),
+    ST_GH_LOGIN: ("login_github", "GitHub 登录失败"),
+    ST_GH_LOGIN_ERROR: ("login_error", "GitHub 登录失败"),
+    ST_DEVICE: ("wait_device", "设备验证失败"),
+    ST_2FA_MOBILE: ("wait_two_factor_mobile", "两步验证失败"),
+    ST_2FA_CODE: ("handle_2fa_code_input", "两步验证失败"),
+    ST_OAUTH: ("oauth", "OAuth 授权失败"),
+}
+
+
+def classify_url(url):
+    """URL -> 页面状态"""
+    u = (url or "").lower()
+    for state, match in URL_RULES:
+        if match(u):
+            return state
+    return ST_UNKNOWN
+
+
+def totp_code(seed, at=None):
+    """RFC 6238 TOTP（30 秒，6 位）"""
+    import hmac
+    import struct
+    key = base64.b32decode(seed.replace(" ", "").upper() + "=" * (-len(seed.replace(" ", "")) % 8))
+    counter = int((at or time.time()) // 30)
+    h = hmac.new(key, struct.pack(">Q", counter), "sha1").digest()
+    o = h[-1] & 0x0F
+    return f"{(struct.unpack('>I', h[o:o + 4])[0] & 0x7FFFFFFF) % 1000000:06d}"
+
+
+def classify(page):
+    """URL + 页面元素 -> 页面状态"""
+    state = classify_url(page.url)
+    for base, sel, refined in PAGE_RULES:
+        if base != state:
+            continue
+        try:
+            if page.locator(sel).first.is_visible():
+                return refined
+        except:
+            pass
+    return state
+
+
+class SideChannel:
+    """
+    旁路 I/O：Telegram / GitHub API 请求放到后台线程，登录主流程不等它们
+    同一通道（lane）内按提交顺序执行，保证消息顺序；run() 结束前统一等待
+    """
     
     def __init__(self):
+        self.lanes = {}
+        self.futures = []
+        self.lock = threading.Lock()
+    
+    def submit(self, lane, fn, *args):
+        with self.lock:
+            if lane not in self.lanes:
+                self.lanes[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"side-{lane}")
+            fut = self.lanes[lane].submit(fn, *args)
+            self.futures.append(fut)
+        return fut
+    
+    def drain(self, timeout=120):
+        """等待所有旁路请求完成（包括任务里再提交的），返回未完成的数量"""
+        deadline = time.time() + timeout
+        while True:
+            with self.lock:
+                futs = list(self.futures)
+            _, pending = wait(futs, timeout=max(0, deadline - time.time()))
+            if pending or len(self.futures) == len(futs):
+                break
+        for ex in self.lanes.values():
+            ex.shutdown(wait=False, cancel_futures=True)
+        self.lanes, self.futures = {}, []
+        return len(pending)
+
+
+class Telegram:
+    """
+    Telegram 通知（传入 SideChannel 时 send / photo 在后台发送）
+    priority：urgent（验证提示）/ normal / low（结果汇总），经 tglimit 限流，高优先级先发
+    """
+    
+    def __init__(self, side=None, clock=CLOCK):
         self.token = os.environ.get('TG_BOT_TOKEN')
         self.chat_id = os.environ.get('TG_CHAT_ID')
         self.ok = bool(self.token and self.chat_id)
+        self.api = os.environ.get('TG_API_BASE', 'https://api.telegram.org')
+        self.side = side
+        self.offset = None  # 启动时同步好的 getUpdates offset
+        self.hooks = None  # requests 的 hooks（流量统计）
+        self.clock = clock
     
-    def send(self, msg):
+    def send(self, msg, priority="normal"):
         if not self.ok:
             return
-        try:
-            requests.post(
-                f"https://api.telegram.org/bot{self.token}/sendMessage",
-                data={"chat_id": self.chat_id, "text": msg, "parse_mode": "HTML"},
-                timeout=30
-            )
-        except:
-            pass
+        if self.side:
+            # 每个优先级一个通道：验证提示不排在结果汇总后面
+            return self.side.submit(f"tg-{priority}", self._send, msg, priority)
+        self._send(msg, priority)
+    
+    def _send(self, msg, priority="normal"):
+        tglimit.post(self.api, self.token, "sendMessage", self.chat_id, {"text": msg, "parse_mode": "HTML"},
+                     priority=priority, hooks=self.hooks)
     
-    def photo(self, path, caption=""):
+    def photo(self, path, caption="", priority="normal"):
         if not self.ok or not os.path.exists(path):
             return
+        if self.side:
+            return self.side.submit(f"tg-{priority}", self._photo, path, caption, priority)
+        self._photo(path, caption, priority)
+    
+    def _photo(self, path, caption="", priority="normal"):
         try:
             with open(path, 'rb') as f:
-                requests.post(
-                    f"https://api.telegram.org/bot{self.token}/sendPhoto",
-                    data={"chat_id": self.chat_id, "caption": caption[:1024]},
-                    files={"photo": f},
-                    timeout=60
-                )
-        except:
-            pass
+                tglimit.post(self.api, self.token, "sendPhoto", self.chat_id, {"caption": caption[:1024]},
+                             files={"photo": f}, priority=priority, hooks=self.hooks, timeout=60)
+        except OSError:
+            metrics.inc("claw_api_errors_total", api="telegram")
+    
+    def get_updates(self, offset=None, poll=0):
+        """getUpdates 原始结果（poll > 0 为长轮询秒数）"""
+        import requests
+        r = requests.get(
+            f"{self.api}/bot{self.token}/getUpdates",
+            params={"timeout": poll, "offset": offset},
+            hooks=self.hooks, timeout=poll + 10
+        )
+        return r.json()
     
     def flush_updates(self):
         """刷新 offset 到最新，避免读到旧消息"""
         if not self.ok:
             return 0
         try:
-            r = requests.get(
-                f"https://api.telegram.org/bot{self.token}/getUpdates",
-                params={"timeout": 0},
-                timeout=10
-            )
-            data = r.json()
+            data = self.get_updates()
             if data.get("ok") and data.get("result"):
                 return data["result"][-1]["update_id"] + 1
         except:
-            pass
+            metrics.inc("claw_api_errors_total", api="telegram")
         return 0
     
+    def sync_offset(self):
+        """启动时提前准备收消息（和浏览器启动并行）：注册 Webhook，或同步 getUpdates offset"""
+        if tghook.receiver(self.token, self.api):
+            return None
+        self.offset = self.flush_updates()
+        return self.offset
+    
+    def match_code(self, upd):
+        """从一条更新里取 /code 验证码（只接受来自 TG_CHAT_ID 的消息）"""
+        msg = upd.get("message") or {}
+        chat = msg.get("chat") or {}
+        if str(chat.get("id")) != str(self.chat_id):
+            return None
+        m = re.match(r"^/code\s+(\d{6,8})$", (msg.get("text") or "").strip())  # 6位TOTP 或 8位恢复码也行
+        return m.group(1) if m else None
+    
     def wait_code(self, timeout=120):
         """
         等待你在 TG 里发 /code 123456
-        只接受来自 TG_CHAT_ID 的消息
+        配置了 TG_WEBHOOK_URL 时由 Webhook 推送立即唤醒，否则轮询 getUpdates
         """
         if not self.ok:
             return None
         
-        # 先刷新 offset，避免读到旧的 /code
-        offset = self.flush_updates()
-        deadline = time.time() + timeout
-        pattern = re.compile(r"^/code\s+(\d{6,8})$")  # 6位TOTP 或 8位恢复码也行
+        hook = tghook.receiver(self.token, self.api, use=True)
+        if hook:
+            try:
+                return hook.wait(self.match_code, hook.cursor(), timeout)
+            finally:
+                tghook.release(self.token, self.api)
         
-        while time.time() < deadline:
+        # 先刷新 offset，避免读到旧的 /code（启动时已同步过就直接用）
+        offset = self.offset if self.offset is not None else self.flush_updates()
+        deadline = self.clock.time() + timeout
+        
+        while self.clock.time() < deadline:
             try:
-                r = requests.get(
-                    f"https://api.telegram.org/bot{self.token}/getUpdates",
-                    params={"timeout": 20, "offset": offset},
-                    timeout=30
-                )
-                data = r.json()
+                poll = max(1, min(20, int(deadline - self.clock.time())))
+                data = self.get_updates(offset, poll)
                 if not data.get("ok"):
-                    time.sleep(2)
+                    metrics.inc("claw_api_errors_total", api="telegram")
+                    self.clock.sleep(2)
                     continue
                 
+                # 长轮询本身会等待，收到结果后立即进入下一轮
                 for upd in data.get("result", []):
                     offset = upd["update_id"] + 1
-                    msg = upd.get("message") or {}
-                    chat = msg.get("chat") or {}
-                    if str(chat.get("id")) != str(self.chat_id):
-                        continue
-                    
-                    text = (msg.get("text") or "").strip()
-                    m = pattern.match(text)
-                    if m:
-                        return m.group(1)
+                    code = self.match_code(upd)
+                    if code:
+                        return code
             
             except Exception:
-                pass
-            
-            time.sleep(2)
+                metrics.inc("claw_api_errors_total", api="telegram")
+                self.clock.sleep(2)
         
         return None
 
@@ -124,6 +293,7 @@ class SecretUpdater:
         self.token = os.environ.get('REPO_TOKEN')
         self.repo = os.environ.get('GITHUB_REPOSITORY')
         self.ok = bool(self.token and self.repo)
+        self.hooks = None  # requests 的 hooks（流量统计）
         if self.ok:
             print("✅ Secret 自动更新已启用")
         else:
@@ -133,6 +303,7 @@ class SecretUpdater:
         if not self.ok:
             return False
         try:
+            import requests
             from nacl import encoding, public
             
             headers = {
@@ -143,9 +314,10 @@ class SecretUpdater:
             # 获取公钥
             r = requests.get(
                 f"https://api.github.com/repos/{self.repo}/actions/secrets/public-key",
-                headers=headers, timeout=30
+                headers=headers, hooks=self.hooks, timeout=30
             )
             if r.status_code != 200:
+                metrics.inc("claw_api_errors_total", api="github")
                 return False
             
             key_data = r.json()
@@ -157,10 +329,14 @@ class SecretUpdater:
                 f"https://api.github.com/repos/{self.repo}/actions/secrets/{name}",
                 headers=headers,
                 json={"encrypted_value": base64.b64encode(encrypted).decode(), "key_id": key_data['key_id']},
-                timeout=30
+                hooks=self.hooks, timeout=30
             )
-            return r.status_code in [201, 204]
+            if r.status_code not in [201, 204]:
+                metrics.inc("claw_api_errors_total", api="github")
+                return False
+            return True
         except Exception as e:
+            metrics.inc("claw_api_errors_total", api="github")
             print(f"更新 Secret 失败: {e}")
             return False
 
@@ -168,31 +344,107 @@ class SecretUpdater:
 class AutoLogin:
     """自动登录"""
     
-    def __init__(self):
+    def __init__(self, account=None, har=None, force=False, clock=CLOCK):
+        self.clock = clock  # 轮询等待都走它（harness.py 换成假时钟）
         self.username = os.environ.get('GH_USERNAME')
         self.password = os.environ.get('GH_PASSWORD')
         self.gh_session = os.environ.get('GH_SESSION', '').strip()
-        self.tg = Telegram()
+        self.totp = os.environ.get('GH_TOTP_SECRET', '').strip()
+        self.cookies = []
+        self.storage_state = None
+        
+        # 多账号：从加密保险箱读取（CLAW_ACCOUNT + CLAW_VAULT_KEY）
+        self.account = account or os.environ.get('CLAW_ACCOUNT', '')
+        self.vault = None
+        if self.account:
+            self.vault = Vault()
+            rec = self.vault.get(self.account) or {}
+            self.username = rec.get('username') or self.username
+            self.password = rec.get('password') or self.password
+            self.totp = rec.get('totp') or self.totp
+            self.cookies = rec.get('cookies') or []
+            self.storage_state = rec.get('storage_state')
+        else:
+            self.storage_state = load_state()
+        
+        self.side = SideChannel()
+        self.traffic = Traffic()  # 按阶段 + 域名的请求 / 字节 / 缓存命中
+        self.tg = Telegram(self.side, clock)
+        self.tg.hooks = self.traffic.hooks('telegram')
         self.secret = SecretUpdater()
+        self.secret.hooks = self.traffic.hooks('github_api')
+        
+        # HAR 录制 / 回放；回放时用占位凭据，不发通知、不写 Secret / 保险箱
+        self.har = har or HarMode()
+        self.fixed_code = ''
+        self.otp = ''  # 本次填入的验证码，只用于脱敏
+        if self.har.replaying:
+            self.username = PLACEHOLDERS['username']
+            self.password = PLACEHOLDERS['password']
+            self.fixed_code = PLACEHOLDERS['code']
+            self.tg.ok = self.secret.ok = False
+            self.vault = None
         self.shots = []
-        self.logs = []
+        self.captions = {}  # 截图路径 -> 名称
+        self.store = ShotStore(self.account or self.username)
+        self.logs = deque(maxlen=logsink.LOG_RING)  # 最近的日志行（通知里带最后几行）
+        self.sink = logsink.sink()  # 结构化日志文件，后台线程写
         self.n = 0
-        
+        self.navs = 0  # 主框架导航计数
+        self.visits = {}  # 状态 -> 已处理次数
+        self.err = ""
+        self.started = clock.time()
+        self.timings = {}  # 阶段 -> 秒
+        self.path = []  # 依次处理过的页面状态（验证路径）
+        self.ok = False
+        self.finished = False
+        # 整次运行一个预算，所有等待从里面扣，留够时间保存状态和通知
+        self.deadline = Deadline(clock=clock)
+        self.to = Timeouts(deadline=self.deadline, clock=clock)  # 各步骤超时按历史耗时自适应
+        self.pages = []  # 登录页 / 控制台 / 应用页的页面计时
+        self.pool = ProxyPool()
+        self.prof = Profiler(self.account or self.username)  # CLAW_PROFILE=1 时生效
+        self.proxy = None  # 本账号固定的出口代理（None 为直连）
+        self.force = force or lease.FORCE  # 手动触发：不因近期成功跳过
+
+    def on_nav(self, frame):
+        if frame.parent_frame is None:
+            self.navs += 1
+    
+    @contextmanager
+    def stage(self, name):
+        """记录阶段耗时（同名阶段累加），期间的浏览器流量记到这个阶段"""
+        t = self.clock.time()
+        outer, self.traffic.stage = self.traffic.stage, name
+        try:
+            yield
+        finally:
+            self.traffic.stage = outer
+            self.timings[name] = self.timings.get(name, 0) + self.clock.time() - t
+
     def log(self, msg, level="INFO"):
         icons = {"INFO": "ℹ️", "SUCCESS": "✅", "ERROR": "❌", "WARN": "⚠️", "STEP": "🔹"}
         line = f"{icons.get(level, '•')} {msg}"
         print(line)
         self.logs.append(line)
+        if self.sink:
+            # 当前阶段取自流量统计（stage() 同时维护）
+            self.sink.emit(logsink.record(level, msg, self.account or self.username, self.traffic.stage,
+                                          self.clock.time() - self.started))
     
     def shot(self, page, name):
+        """截图存到本次运行目录（JPEG，相同画面只存一份），返回文件路径；失败返回 None"""
         self.n += 1
-        f = f"{self.n:02d}_{name}.png"
         try:
-            page.screenshot(path=f)
+            label = f"{self.n:02d}_{name}"
+            f = self.store.put(page.screenshot(type='jpeg', quality=SHOT_QUALITY), label)
+            if f in self.shots:
+                self.shots.remove(f)  # 同一画面只留最新一次，通知里不重复发
             self.shots.append(f)
+            self.captions[f] = label
+            return f
         except:
-            pass
-        return f
+            return None
     
     def click(self, page, sels, desc=""):
         for s in sels:
@@ -206,6 +458,62 @@ class AutoLogin:
                 pass
         return False
     
+    def github_cookies(self, fallback=True):
+        """本次会带上的 github.com Cookie（storage_state / 保险箱；fallback 时没有就用 GH_SESSION）"""
+        cookies = (self.storage_state or {}).get('cookies') or self.cookies
+        jar = {c['name']: c['value'] for c in cookies if 'github.com' in c.get('domain', '')}
+        if 'user_session' not in jar and fallback and self.gh_session:
+            jar.update(user_session=self.gh_session, logged_in='yes')
+        return jar
+    
+    def check_session(self):
+        """GitHub 会话是否有效：True / False，没有 Session 为 None"""
+        jar = self.github_cookies()
+        if 'user_session' not in jar:
+            return None
+        import requests
+        r = requests.get('https://github.com/settings/profile', cookies=jar, allow_redirects=False,
+                         proxies=requests_proxies(self.proxy), hooks=self.traffic.hooks('coldstart'), timeout=15)
+        return r.status_code == 200
+    
+    def warm(self, url):
+        """DNS 解析 + TLS 握手预热，返回毫秒"""
+        import requests
+        t = time.time()
+        requests.head(url, proxies=requests_proxies(self.proxy), allow_redirects=False,
+                      hooks=self.traffic.hooks('coldstart'), timeout=15)
+        return (time.time() - t) * 1000
+    
+    def cold_start(self):
+        """
+        浏览器启动期间并行做的准备：预热 github.com 和 ClawCloud 区域域名、
+        检查 Session 是否有效、同步 Telegram offset；返回 {名称: Future}
+        """
+        if self.har.replaying:
+            return {}
+        ex = ThreadPoolExecutor(max_workers=4, thread_name_prefix="coldstart")
+        jobs = {
+            'warm_github': ex.submit(self.warm, 'https://github.com/login'),
+            'warm_claw': ex.submit(self.warm, SIGNIN_URL),
+            'session': ex.submit(self.check_session),
+        }
+        if self.tg.ok:
+            jobs['tg_offset'] = ex.submit(self.tg.sync_offset)
+        ex.shutdown(wait=False)
+        return jobs
+    
+    def joined(self, jobs, name, timeout=5):
+        """取冷启动任务结果；没做 / 出错 / 超时为 None"""
+        fut = jobs.get(name)
+        if not fut:
+            return None
+        try:
+            return fut.result(timeout=self.deadline.cap(timeout))
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            return None
+    
     def get_session(self, context):
         """提取 Session Cookie"""
         try:
@@ -222,8 +530,11 @@ class AutoLogin:
             return
         
         self.log(f"新 Cookie: {value[:15]}...{value[-8:]}", "SUCCESS")
-        
-        # 自动更新 Secret
+        # GitHub API 往返不占主流程
+        self.side.submit("github", self.publish_cookie, value)
+    
+    def publish_cookie(self, value):
+        """更新 GH_SESSION Secret，失败则通过 Telegram 发送"""
         if self.secret.update('GH_SESSION', value):
             self.log("已自动更新 GH_SESSION", "SUCCESS")
             self.tg.send("🔑 <b>Cookie 已自动更新</b>\n\nGH_SESSION 已保存")
@@ -235,36 +546,43 @@ class AutoLogin:
 <code>{value}</code>""")
             self.log("已通过 Telegram 发送 Cookie", "SUCCESS")
     
+    def save_state(self, context):
+        """登录状态写回保险箱 / CLAW_STORAGE_STATE 文件"""
+        try:
+            save_state(self.account if self.vault else "", context.storage_state())
+            self.log(f"已保存登录状态: {self.account or 'storage_state'}", "SUCCESS")
+        except Exception as e:
+            self.log(f"保存登录状态失败: {e}", "WARN")
+    
     def wait_device(self, page):
         """等待设备验证"""
-        self.log(f"需要设备验证，等待 {DEVICE_VERIFY_WAIT} 秒...", "WARN")
+        limit = int(self.deadline.cap(DEVICE_VERIFY_WAIT))
+        self.log(f"需要设备验证，等待 {limit} 秒...", "WARN")
         self.shot(page, "设备验证")
         
         self.tg.send(f"""⚠️ <b>需要设备验证</b>
 
-请在 {DEVICE_VERIFY_WAIT} 秒内批准：
+请在 {limit} 秒内批准：
 1️⃣ 检查邮箱点击链接
-2️⃣ 或在 GitHub App 批准""")
+2️⃣ 或在 GitHub App 批准""", "urgent")
         
         if self.shots:
-            self.tg.photo(self.shots[-1], "设备验证页面")
-        
-        for i in range(DEVICE_VERIFY_WAIT):
-            time.sleep(1)
-            if i % 5 == 0:
-                self.log(f"  等待... ({i}/{DEVICE_VERIFY_WAIT}秒)")
-                url = page.url
-                if 'verified-device' not in url and 'device-verification' not in url:
-                    self.log("设备验证通过！", "SUCCESS")
-                    self.tg.send("✅ <b>设备验证通过</b>")
-                    return True
-                try:
-                    page.reload(timeout=10000)
-                    page.wait_for_load_state('networkidle', timeout=10000)
-                except:
-                    pass
+            self.tg.photo(self.shots[-1], "设备验证页面", "urgent")
         
-        if 'verified-device' not in page.url:
+        # 每 5 秒没跳走就刷新一次（批准后页面不一定自己跳）
+        for i in range(0, limit, 5):
+            self.log(f"  等待... ({i}/{limit}秒)")
+            if self.wait_leave(page, ST_DEVICE, min(5, limit - i)):
+                self.log("设备验证通过！", "SUCCESS")
+                self.tg.send("✅ <b>设备验证通过</b>")
+                return True
+            try:
+                with self.to.measure('reload') as ms:
+                    page.reload(timeout=ms)
+            except:
+                pass
+        
+        if classify_url(page.url) != ST_DEVICE:
             return True
         
         self.log("设备验证超时", "ERROR")
@@ -273,46 +591,44 @@ class AutoLogin:
     
     def wait_two_factor_mobile(self, page):
         """等待 GitHub Mobile 两步验证批准，并把数字截图提前发到电报"""
-        self.log(f"需要两步验证（GitHub Mobile），等待 {TWO_FACTOR_WAIT} 秒...", "WARN")
+        limit = int(self.deadline.cap(TWO_FACTOR_WAIT))
+        self.log(f"需要两步验证（GitHub Mobile），等待 {limit} 秒...", "WARN")
         
         # 先截图并立刻发出去（让你看到数字）
         shot = self.shot(page, "两步验证_mobile")
         self.tg.send(f"""⚠️ <b>需要两步验证（GitHub Mobile）</b>
 
 请打开手机 GitHub App 批准本次登录（会让你确认一个数字）。
-等待时间：{TWO_FACTOR_WAIT} 秒""")
+等待时间：{limit} 秒""", "urgent")
         if shot:
-            self.tg.photo(shot, "两步验证页面（数字在图里）")
+            self.tg.photo(shot, "两步验证页面（数字在图里）", "urgent")
         
-        # 不要频繁 reload，避免把流程刷回登录页
-        for i in range(TWO_FACTOR_WAIT):
-            time.sleep(1)
-            
-            url = page.url
-            
-            # 如果离开 two-factor 流程页面，认为通过
-            if "github.com/sessions/two-factor/" not in url:
-                self.log("两步验证通过！", "SUCCESS")
-                self.tg.send("✅ <b>两步验证通过</b>")
+        # 批准后页面会自己跳走，等导航即可；不要频繁 reload，避免把流程刷回登录页
+        for i in range(0, limit, 10):
+            if self.wait_leave(page, ST_2FA_MOBILE, min(10, limit - i)):
+                state = classify_url(page.url)
+                # 如果被刷回登录页，说明这次流程断了（不要硬等）
+                if state == ST_GH_LOGIN:
+                    self.log("两步验证后回到了登录页，需重新登录", "ERROR")
+                    return False
+                # 切到了其它两步验证方式，交给对应的处理函数
+                if state != ST_2FA_CODE:
+                    self.log("两步验证通过！", "SUCCESS")
+                    self.tg.send("✅ <b>两步验证通过</b>")
                 return True
             
-            # 如果被刷回登录页，说明这次流程断了（不要硬等）
-            if "github.com/login" in url:
-                self.log("两步验证后回到了登录页，需重新登录", "ERROR")
-                return False
-            
             # 每 10 秒打印一次，并补发一次截图（防止你没看到数字）
-            if i % 10 == 0 and i != 0:
-                self.log(f"  等待... ({i}/{TWO_FACTOR_WAIT}秒)")
-                shot = self.shot(page, f"两步验证_{i}s")
+            if i + 10 < limit:
+                self.log(f"  等待... ({i + 10}/{limit}秒)")
+                shot = self.shot(page, f"两步验证_{i + 10}s")
                 if shot:
-                    self.tg.photo(shot, f"两步验证页面（第{i}秒）")
+                    self.tg.photo(shot, f"两步验证页面（第{i + 10}秒）", "urgent")
             
-            # 只在 30 秒、60 秒... 做一次轻刷新（可选，频率很低）
-            if i % 30 == 0 and i != 0:
+            # 只在 30 秒、60 秒... 做一次轻刷新（可选，频率很低；最后一轮不刷）
+            if (i + 10) % 30 == 0 and i + 10 < limit:
                 try:
-                    page.reload(timeout=30000)
-                    page.wait_for_load_state('domcontentloaded', timeout=30000)
+                    with self.to.measure('reload') as ms:
+                        page.reload(timeout=ms, wait_until='domcontentloaded')
                 except:
                     pass
         
@@ -338,28 +654,40 @@ class AutoLogin:
                     el = page.locator(sel).first
                     if el.is_visible(timeout=2000):
                         el.click()
-                        time.sleep(2)
-                        page.wait_for_load_state('networkidle', timeout=15000)
+                        with self.to.measure('load') as ms:
+                            page.wait_for_load_state('domcontentloaded', timeout=ms)
                         self.log("已切换到验证码输入页面", "SUCCESS")
                         shot = self.shot(page, "两步验证_code_切换后")
                         break
-                except:
+                except DeadlineExceeded:
+                    raise
+                except Exception:
                     pass
-        except:
+        except DeadlineExceeded:
+            raise
+        except Exception:
             pass
         
-        # 发送提示并等待验证码
-        self.tg.send(f"""🔐 <b>需要验证码登录</b>
+        if self.fixed_code:
+            code = self.fixed_code
+        elif self.totp:
+            # 保险箱里有 TOTP 种子，直接算，不用等 Telegram
+            self.log("使用保险箱中的 TOTP 种子生成验证码", "SUCCESS")
+            code = totp_code(self.totp)
+        else:
+            # 发送提示并等待验证码
+            limit = int(self.deadline.cap(TWO_FACTOR_WAIT))
+            self.tg.send(f"""🔐 <b>需要验证码登录</b>
 
 请在 Telegram 里发送：
 <code>/code 你的6位验证码</code>
 
-等待时间：{TWO_FACTOR_WAIT} 秒""")
-        if shot:
-            self.tg.photo(shot, "两步验证页面")
+等待时间：{limit} 秒""", "urgent")
+            if shot:
+                self.tg.photo(shot, "两步验证页面", "urgent")
         
-        self.log(f"等待验证码（{TWO_FACTOR_WAIT}秒）...", "WARN")
-        code = self.tg.wait_code(timeout=TWO_FACTOR_WAIT)
+            self.log(f"等待验证码（{limit}秒）...", "WARN")
+            code = self.tg.wait_code(timeout=limit)
         
         if not code:
             self.log("等待验证码超时", "ERROR")
@@ -367,6 +695,7 @@ class AutoLogin:
             return False
         
         # 不打印验证码明文，只提示收到
+        self.otp = code
         self.log("收到验证码，正在填入...", "SUCCESS")
         self.tg.send("✅ 收到验证码，正在填入...")
         
@@ -386,7 +715,7 @@ class AutoLogin:
                 if el.is_visible(timeout=2000):
                     el.fill(code)
                     self.log(f"已填入验证码", "SUCCESS")
-                    time.sleep(1)
+                    self.clock.sleep(1)
                     
                     # 优先点击 Verify 按钮，不行再 Enter
                     submitted = False
@@ -410,12 +739,12 @@ class AutoLogin:
                         page.keyboard.press("Enter")
                         self.log("已按 Enter 提交", "SUCCESS")
                     
-                    time.sleep(3)
-                    page.wait_for_load_state('networkidle', timeout=30000)
+                    # 检查是否通过（离开两步验证页即通过）
+                    with self.to.measure('2fa_submit') as ms:
+                        left = self.wait_leave(page, ST_2FA_CODE, ms / 1000)
                     self.shot(page, "验证码提交后")
                     
-                    # 检查是否通过
-                    if "github.com/sessions/two-factor/" not in page.url:
+                    if left:
                         self.log("验证码验证通过！", "SUCCESS")
                         self.tg.send("✅ <b>验证码验证通过</b>")
                         return True
@@ -423,6 +752,8 @@ class AutoLogin:
                         self.log("验证码可能错误", "ERROR")
                         self.tg.send("❌ <b>验证码可能错误，请检查后重试</b>")
                         return False
+            except DeadlineExceeded:
+                raise
             except:
                 pass
         
@@ -430,8 +761,26 @@ class AutoLogin:
         self.tg.send("❌ <b>没找到验证码输入框</b>")
         return False
     
-    def login_github(self, page, context):
+    def open_github(self, page):
+        """ClawCloud 登录页：点击 GitHub"""
+        if self.visits.get(ST_GH_LOGIN) or self.visits.get(ST_OAUTH):
+            self.log("又回到了 ClawCloud 登录页", "ERROR")
+            return False
+        if self.visits.get(ST_CLAW_SIGNIN, 0) > 1:
+            return True  # 登录页内部跳转，按钮已点过
+        self.log("点击 GitHub...", "STEP")
+        return self.wait_click(page, [
+            'button:has-text("GitHub")',
+            'a:has-text("GitHub")',
+            '[data-provider="github"]'
+        ], "GitHub", ST_CLAW_SIGNIN)
+    
+    def login_github(self, page):
         """登录 GitHub"""
+        if self.visits.get(ST_GH_LOGIN, 0) > 1:
+            self.log("提交后仍停留在登录页", "ERROR")
+            return False
+        
         self.log("登录 GitHub...", "STEP")
         self.shot(page, "github_登录页")
         
@@ -449,94 +798,140 @@ class AutoLogin:
             page.locator('input[type="submit"], button[type="submit"]').first.click()
         except:
             pass
-        
-        time.sleep(3)
-        page.wait_for_load_state('networkidle', timeout=30000)
-        self.shot(page, "github_登录后")
-        
-        url = page.url
-        self.log(f"当前: {url}")
-        
-        # 设备验证
-        if 'verified-device' in url or 'device-verification' in url:
-            if not self.wait_device(page):
-                return False
-            time.sleep(2)
-            page.wait_for_load_state('networkidle', timeout=30000)
-            self.shot(page, "验证后")
-        
-        # 2FA
-        if 'two-factor' in page.url:
-            self.log("需要两步验证！", "WARN")
-            self.shot(page, "两步验证")
-            
-            # GitHub Mobile：等待你在手机上批准
-            if 'two-factor/mobile' in page.url:
-                if not self.wait_two_factor_mobile(page):
-                    return False
-                # 通过后等页面稳定
-                try:
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    time.sleep(2)
-                except:
-                    pass
-            
-            else:
-                # 其它两步验证方式（TOTP/恢复码等），尝试通过 Telegram 输入验证码
-                if not self.handle_2fa_code_input(page):
-                    return False
-                # 通过后等页面稳定
-                try:
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    time.sleep(2)
-                except:
-                    pass
-        
-        # 错误
+        return True
+    
+    def login_error(self, page):
+        """GitHub 登录页报错"""
+        self.shot(page, "github_登录错误")
         try:
-            err = page.locator('.flash-error').first
-            if err.is_visible(timeout=2000):
-                self.log(f"错误: {err.inner_text()}", "ERROR")
-                return False
+            self.log(f"错误: {page.locator('.flash-error').first.inner_text()}", "ERROR")
         except:
-            pass
-        
-        return True
+            self.log("GitHub 登录报错", "ERROR")
+        return False
     
     def oauth(self, page):
         """处理 OAuth"""
-        if 'github.com/login/oauth/authorize' in page.url:
-            self.log("处理 OAuth...", "STEP")
-            self.shot(page, "oauth")
-            self.click(page, ['button[name="authorize"]', 'button:has-text("Authorize")'], "授权")
-            time.sleep(3)
-            page.wait_for_load_state('networkidle', timeout=30000)
-    
-    def wait_redirect(self, page, wait=60):
-        """等待重定向"""
-        self.log("等待重定向...", "STEP")
-        for i in range(wait):
-            url = page.url
-            if 'claw.cloud' in url and 'signin' not in url.lower():
+        self.log("处理 OAuth...", "STEP")
+        self.shot(page, "oauth")
+        return self.wait_click(page, ['button[name="authorize"]', 'button:has-text("Authorize")'], "授权", ST_OAUTH)
+    
+    def wait_click(self, page, sels, desc, state):
+        """等按钮出现后点击；期间页面已自己跳走也算成功"""
+        try:
+            el = page.locator(", ".join(sels)).first
+            with self.to.measure('click') as ms:
+                el.wait_for(state='visible', timeout=ms)
+            el.click()
+            self.log(f"已点击: {desc}", "SUCCESS")
+            return True
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            return classify_url(page.url) != state
+    
+    def wait_leave(self, page, state, seconds):
+        """等页面离开某个状态，返回是否已离开"""
+        try:
+            page.wait_for_url(lambda u: classify_url(u) != state, timeout=self.deadline.cap(seconds) * 1000)
+            return True
+        except PlaywrightTimeout:
+            return False
+    
+    def drive(self, page):
+        """
+        按导航事件驱动登录流程，直到进入 ClawCloud 控制台
+        每次导航只处理一次当前页面状态，处理函数见 TRANSITIONS
+        """
+        self.log("按页面状态驱动登录流程", "STEP")
+        seen = -1
+        while True:
+            navs = self.navs
+            try:
+                with self.to.measure('load') as ms:
+                    page.wait_for_load_state('domcontentloaded', timeout=ms)
+            except PlaywrightTimeout:
+                pass
+            state = classify(page)
+            if navs != seen:
+                self.prof.sample(state, page.url)
+            if state == ST_CLAW_CONSOLE:
                 self.log("重定向成功！", "SUCCESS")
                 return True
-            if 'github.com/login/oauth/authorize' in url:
-                self.oauth(page)
-            time.sleep(1)
-            if i % 10 == 0:
-                self.log(f"  等待... ({i}秒)")
-        self.log("重定向超时", "ERROR")
-        return False
+            
+            if navs != seen:
+                seen = navs
+                self.visits[state] = self.visits.get(state, 0) + 1
+                self.log(f"当前: {state} {page.url}")
+                if state in TRANSITIONS:
+                    name, reason = TRANSITIONS[state]
+                    self.path.append(state)
+                    with self.stage(state):
+                        ok = getattr(self, name)(page)
+                    if not ok:
+                        self.err = reason
+                        return False
+                    continue
+            
+            if self.navs != seen:
+                continue
+            try:
+                with self.to.measure('nav') as ms:
+                    page.wait_for_event('framenavigated', predicate=lambda f: f.parent_frame is None,
+                                        timeout=ms)
+            except PlaywrightTimeout:
+                self.log(f"等待跳转超时 ({state})", "ERROR")
+                self.err = "重定向超时"
+                return False
+    
+    def nav_timing(self, page, name):
+        """记录当前页面的 Navigation Timing + Resource Timing（毫秒 / 字节）"""
+        try:
+            t = page.evaluate("""() => {
+                const n = performance.getEntriesByType('navigation')[0];
+                const r = performance.getEntriesByType('resource');
+                return {
+                    url: location.href,
+                    ttfb: n ? n.responseStart : null,
+                    dcl: n ? n.domContentLoadedEventEnd : null,
+                    load: n && n.loadEventEnd ? n.loadEventEnd : null,
+                    transfer: n ? n.transferSize : null,
+                    resources: r.length,
+                    resource_bytes: r.reduce((a, x) => a + (x.transferSize || 0), 0),
+                    slowest: r.slice().sort((a, b) => b.duration - a.duration).slice(0, 5)
+                              .map(x => ({name: x.name, ms: Math.round(x.duration)})),
+                };
+            }""")
+            t['page'] = name
+            self.pages.append(t)
+        except:
+            pass
+    
+    def goto(self, page, url, step, tries=2):
+        """打开页面；卡住就按自适应超时尽早放弃并重试"""
+        for i in range(tries):
+            try:
+                with self.to.measure(step) as ms:
+                    return page.goto(url, timeout=ms)
+            except PlaywrightTimeout:
+                if i == tries - 1:
+                    raise
+                self.log(f"打开超时（{ms / 1000:g}s），重试: {url}", "WARN")
     
     def keepalive(self, page):
-        """保活"""
+        """保活（预算不够就跳过，先把登录状态存下来）"""
         self.log("保活...", "STEP")
-        for url, name in [(f"{CLAW_CLOUD_URL}/", "控制台"), (f"{CLAW_CLOUD_URL}/apps", "应用")]:
+        for url, name, key in [(f"{CLAW_CLOUD_URL}/", "控制台", "console"), (f"{CLAW_CLOUD_URL}/apps", "应用", "apps")]:
             try:
-                page.goto(url, timeout=30000)
-                page.wait_for_load_state('networkidle', timeout=15000)
+                self.goto(page, url, 'keepalive')
+                with self.to.measure('idle') as ms:
+                    page.wait_for_load_state('networkidle', timeout=ms)
                 self.log(f"已访问: {name}", "SUCCESS")
-                time.sleep(2)
+                self.nav_timing(page, key)
+                self.prof.sample(f"keepalive:{name}", url)
+                self.clock.sleep(2)
+            except DeadlineExceeded:
+                self.log("运行时间预算不足，跳过保活", "WARN")
+                break
             except:
                 pass
         self.shot(page, "完成")
@@ -553,43 +948,173 @@ class AutoLogin:
         
         if err:
             msg += f"\n<b>错误:</b> {err}"
+        if self.to.used:
+            msg += f"\n<b>超时:</b> {self.to.report()}"
+        if self.traffic.total()[0]:
+            msg += f"\n<b>流量:</b> {self.traffic.summary()}"
         
-        msg += "\n\n<b>日志:</b>\n" + "\n".join(self.logs[-6:])
+        msg += "\n\n<b>日志:</b>\n" + "\n".join(list(self.logs)[-6:])
         
-        self.tg.send(msg)
+        self.tg.send(msg, "low")
         
         if self.shots:
             if not ok:
                 for s in self.shots[-3:]:
-                    self.tg.photo(s, s)
+                    self.tg.photo(s, self.captions.get(s, ""), "low")
             else:
-                self.tg.photo(self.shots[-1], "完成")
+                self.tg.photo(self.shots[-1], "完成", "low")
+    
+    def record(self, ok, err=""):
+        """写入运行历史（回放不计入）"""
+        if self.har.replaying:
+            return
+        self.timings['total'] = self.clock.time() - self.started
+        for stage, sec in self.timings.items():
+            metrics.observe("claw_stage_seconds", sec, stage=stage)
+        try:
+            from history import History
+            h = History()
+            h.record(self.account or self.username or "", REGION, ok, self.started, self.timings,
+                     path=">".join(self.path), nbytes=self.traffic.total()[3], error=err, pages=self.pages,
+                     traffic=self.traffic.rows())
+            # 本区域页面明显变慢时提醒（写进日志，随通知发出）
+            for t in h.trends(region=REGION):
+                if t['slower']:
+                    self.log(f"{REGION} {t['page']} 页面变慢：加载 p50 {t['base_p50']:.0f}ms -> {t['p50']:.0f}ms"
+                             f"（p={t['p']:.3f}）", "WARN")
+            h.close()
+        except Exception as e:
+            print(f"写入运行历史失败: {e}")
+    
+    def finish(self, ok, err=""):
+        """结束：记录历史并通知"""
+        self.ok = ok
+        self.finished = True
+        self.record(ok, err)
+        if self.to.used:
+            self.log(f"本次超时设置: {self.to.report()}")
+        if self.traffic.total()[0]:
+            print(f"📶 流量: {self.traffic.summary()}")
+        if not self.har.replaying:
+            try:
+                self.to.save()
+            except Exception as e:
+                print(f"保存超时统计失败: {e}")
+        self.notify(ok, err)
     
     def run(self):
+        """
+        入口：登录流程跑完后再等旁路 I/O（通知、Secret 更新）收尾
+        没有运行（近期已成功 / 别的运行持有租约）时返回 lease.Skipped，失败时 sys.exit(1)
+        """
+        name = self.account or self.username or ""
+        lock = None
+        if not self.har.replaying:
+            # 刚成功过就不再开浏览器；同一账号已有运行在登录就退出
+            last = None if self.force else lease.recent_success(name)
+            if last:
+                print(f"⏭️ {name or '账号'} 在 {time.strftime('%m-%d %H:%M', time.localtime(last))} 已登录成功，"
+                      f"{lease.SUCCESS_TTL:g} 小时内不重复运行（CLAW_FORCE=1 强制）")
+                return lease.Skipped(last + lease.SUCCESS_TTL * 3600, "近期已登录成功")
+            lock = lease.Lease(name)
+            if not lock.acquire():
+                print(f"⏭️ {name or '账号'} 正在由另一个运行登录，本次退出")
+                return lease.Skipped(lock.until, "另一个运行正在登录")
+        self.prof.start()
+        try:
+            self.login()
+        except Exception as e:
+            # 浏览器没起来就失败了（排队超时、启动失败），同样要通知
+            if self.finished:
+                raise
+            self.log(f"异常: {e}", "ERROR")
+            self.finish(False, str(e))
+            sys.exit(1)
+        finally:
+            # 预留时间都给收尾
+            pending = self.side.drain(timeout=self.deadline.hard_left())
+            if pending:
+                print(f"⚠️ 有 {pending} 个通知/请求未完成")
+            try:
+                self.store.prune()  # 通知里的截图发完后再按磁盘预算淘汰
+            except Exception as e:
+                print(f"清理截图失败: {e}")
+            # 先放租约，剖析收尾出错也不能把账号锁住
+            if lock:
+                lock.release(self.ok)
+            try:
+                bundle = self.prof.finish(self.ok, self.timings)
+                if bundle:
+                    print(f"🧾 性能剖析: {bundle}")
+            except Exception as e:
+                print(f"性能剖析收尾失败: {e}")
+            if self.sink:
+                self.sink.flush()
+    
+    def login(self):
         print("\n" + "="*50)
         print("🚀 ClawCloud 自动登录")
         print("="*50 + "\n")
         
+        if self.account:
+            self.log(f"账号: {self.account}（保险箱）")
         self.log(f"用户名: {self.username}")
         self.log(f"Session: {'有' if self.gh_session else '无'}")
         self.log(f"密码: {'有' if self.password else '无'}")
         
         if not self.username or not self.password:
             self.log("缺少凭据", "ERROR")
-            self.notify(False, "凭据未配置")
+            self.finish(False, "凭据未配置")
             sys.exit(1)
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=['--no-sandbox'])
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
-            page = context.new_page()
+        capture = Capture(self.account or self.username)
+        # 同一账号固定出口 IP，换 IP 会触发 GitHub 设备验证
+        if self.pool.enabled and not self.har.replaying:
+            self.proxy = self.pool.assign(self.account or self.username)
+            self.log(f"代理: {mask(self.proxy)}")
+        # 网络预热、Session 检查、Telegram offset 同步和浏览器启动同时进行
+        jobs = self.cold_start()
+        sync_playwright = load_playwright()
+        # 本机同时运行的浏览器有上限，满了就排队
+        with BrowserSlots(clock=self.clock).acquire(timeout=self.deadline.left()), sync_playwright() as p:
+            options = capture.context_options()
+            if options and self.har.record:
+                # 一个 context 只能录一份 HAR：录制的那份优先，失败时再复制进失败现场
+                self.log("CLAW_TRACE 和 HAR 录制同时开启：失败现场里的 HAR 使用录制的那份", "WARN")
+            options.update(self.har.context_options())
+            with self.stage('launch'):
+                browser = p.chromium.launch(headless=True, args=['--no-sandbox'],
+                                            proxy=playwright_proxy(self.proxy))
+                context = browser.new_context(
+                    viewport={'width': 1920, 'height': 1080},
+                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                    storage_state=self.storage_state,
+                    **options
+                )
+                capture.start(context)
+                self.har.attach(context)
+                page = context.new_page()
+                self.prof.attach(context, page)
+                self.traffic.attach(context, page)
+            page.on('framenavigated', self.on_nav)
             
             try:
+                for name in ('warm_github', 'warm_claw'):
+                    ms = self.joined(jobs, name, timeout=0)
+                    if ms is not None:
+                        self.timings[name] = ms / 1000
+                valid = self.joined(jobs, 'session')
+                if valid is not None:
+                    self.log(f"GitHub 会话: {'有效' if valid else '已失效，将用密码登录'}",
+                             "SUCCESS" if valid else "WARN")
+                
                 # 预加载 Cookie
-                if self.gh_session:
+                if self.cookies and not self.storage_state:
+                    context.add_cookies(self.cookies)
+                    self.log("已加载保险箱 Cookie", "SUCCESS")
+                # GH_SESSION 只在没有已保存的会话、或已保存的会话失效时才注入，不覆盖更新的 storage_state / 保险箱
+                stored = self.github_cookies(fallback=False).get('user_session')
+                if self.gh_session and self.gh_session != stored and (valid is False if stored else valid is not False):
                     try:
                         context.add_cookies([
                             {'name': 'user_session', 'value': self.gh_session, 'domain': 'github.com', 'path': '/'},
@@ -601,91 +1126,68 @@ class AutoLogin:
                 
                 # 1. 访问 ClawCloud
                 self.log("步骤1: 打开 ClawCloud", "STEP")
-                page.goto(SIGNIN_URL, timeout=60000)
-                page.wait_for_load_state('networkidle', timeout=30000)
-                time.sleep(2)
+                with self.stage('signin'):
+                    self.goto(page, SIGNIN_URL, 'signin')
+                self.nav_timing(page, 'signin')
                 self.shot(page, "clawcloud")
                 
-                if 'signin' not in page.url.lower():
-                    self.log("已登录！", "SUCCESS")
-                    self.keepalive(page)
-                    # 提取并保存新 Cookie
-                    new = self.get_session(context)
-                    if new:
-                        self.save_cookie(new)
-                    self.notify(True)
-                    print("\n✅ 成功！\n")
-                    return
-                
-                # 2. 点击 GitHub
-                self.log("步骤2: 点击 GitHub", "STEP")
-                if not self.click(page, [
-                    'button:has-text("GitHub")',
-                    'a:has-text("GitHub")',
-                    '[data-provider="github"]'
-                ], "GitHub"):
-                    self.log("找不到按钮", "ERROR")
-                    self.notify(False, "找不到 GitHub 按钮")
-                    sys.exit(1)
-                
-                time.sleep(3)
-                page.wait_for_load_state('networkidle', timeout=30000)
-                self.shot(page, "点击后")
-                
-                url = page.url
-                self.log(f"当前: {url}")
-                
-                # 3. GitHub 登录
-                self.log("步骤3: GitHub 认证", "STEP")
-                
-                if 'github.com/login' in url or 'github.com/session' in url:
-                    if not self.login_github(page, context):
-                        self.shot(page, "登录失败")
-                        self.notify(False, "GitHub 登录失败")
-                        sys.exit(1)
-                elif 'github.com/login/oauth/authorize' in url:
-                    self.log("Cookie 有效", "SUCCESS")
-                    self.oauth(page)
-                
-                # 4. 等待重定向
-                self.log("步骤4: 等待重定向", "STEP")
-                if not self.wait_redirect(page):
-                    self.shot(page, "重定向失败")
-                    self.notify(False, "重定向失败")
+                # 2. 登录（GitHub 认证 / 设备验证 / 两步验证 / OAuth），已登录时直接结束
+                self.log("步骤2: 登录", "STEP")
+                if not self.drive(page):
+                    self.shot(page, "登录失败")
+                    self.finish(False, self.err)
                     sys.exit(1)
                 
                 self.shot(page, "重定向成功")
                 
-                # 5. 验证
-                self.log("步骤5: 验证", "STEP")
-                if 'claw.cloud' not in page.url or 'signin' in page.url.lower():
-                    self.notify(False, "验证失败")
-                    sys.exit(1)
-                
-                # 6. 保活
-                self.keepalive(page)
+                # 3. 保活
+                with self.stage('keepalive'):
+                    self.keepalive(page)
                 
-                # 7. 提取并保存新 Cookie
-                self.log("步骤6: 更新 Cookie", "STEP")
-                new = self.get_session(context)
-                if new:
-                    self.save_cookie(new)
-                else:
-                    self.log("未获取到新 Cookie", "WARN")
+                # 4. 提取并保存新 Cookie
+                self.log("步骤3: 更新 Cookie", "STEP")
+                with self.stage('cookie'):
+                    new = self.get_session(context)
+                    if self.vault or STORAGE_STATE:
+                        self.save_state(context)
+                    if not self.vault:
+                        if new:
+                            self.save_cookie(new)
+                        else:
+                            self.log("未获取到新 Cookie", "WARN")
                 
-                self.notify(True)
+                self.finish(True)
                 print("\n" + "="*50)
                 print("✅ 成功！")
                 print("="*50 + "\n")
                 
             except Exception as e:
                 self.log(f"异常: {e}", "ERROR")
+                if self.proxy and ("ERR_PROXY" in str(e) or "ERR_TUNNEL" in str(e)):
+                    # 代理连不上：标记不健康，下次运行切到别的健康代理
+                    self.pool.failover(self.proxy)
+                    self.log(f"代理 {mask(self.proxy)} 不可用，下次运行将切换", "WARN")
                 self.shot(page, "异常")
                 import traceback
                 traceback.print_exc()
-                self.notify(False, str(e))
+                self.finish(False, str(e))
                 sys.exit(1)
             finally:
+                # 失败现场和录制共用的脱敏表，要在 context 关闭前取 Cookie
+                secrets = {
+                    self.get_session(context) or '': PLACEHOLDERS['session'],
+                    self.gh_session: PLACEHOLDERS['session'],
+                    self.username or '': PLACEHOLDERS['username'],
+                    self.password or '': PLACEHOLDERS['password'],
+                    self.otp: PLACEHOLDERS['code'],
+                } if self.har.record or capture.enabled else {}
+                for f in capture.finish(context, failed=not self.ok, secrets=secrets):
+                    print(f"🧾 已保存失败现场: {f}")
+                har = self.har.finish(context, secrets)
+                if har:
+                    print(f"🧾 已录制 HAR: {har}")
+                    for f in capture.attach(har):
+                        print(f"🧾 已保存失败现场: {f}")
                 browser.close()
 
 
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+统一入口：每个子命令只导入自己用到的模块
+（Playwright 只有 login 导入；requests / PyNaCl 在真正发请求、解密时才导入），status 之类的命令几十毫秒内返回
+
+用法：
+    python claw.py login [账号] [--force]    完整浏览器登录（--force：不因近期成功跳过）
+    python claw.py probe [账号] [--api]      不开浏览器：检查并续期 GitHub 会话（--api：请求 ClawCloud 保活接口）
+    python claw.py schedule                  常驻调度（同 VPS/scheduler.py）
+    python claw.py status                    各账号最近一次运行和下次计划
+    python claw.py startup [--runs 10]       启动耗时基准
+"""
+
+import os
+import sys
+import time
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# 仓库内运行时从 VPS/ 找 scheduler.py；部署时两者在同一目录。放在末尾，VPS/ 里的旧脚本不会盖住这里的模块
+_VPS = os.path.join(HERE, "..", "VPS")
+if os.path.isdir(_VPS):
+    sys.path.append(_VPS)
+
+HEAVY = ("playwright", "requests", "urllib3", "nacl")
+
+
+def cmd_login(args):
+    from auto_login import AutoLogin
+
+    AutoLogin(args.account or None, force=args.force).run()
+    return 0
+
+
+def cmd_probe(args):
+    import policy
+
+    fn = policy.api_keepalive if args.api else policy.probe
+    try:
+        ok = fn(args.account or "")
+    except Exception as e:
+        print(f"❌ 出错: {e}")
+        ok = False
+    print(f"{'✅' if ok else '❌'} {args.account or '账号'} {'api' if args.api else 'probe'} {'成功' if ok else '失败'}")
+    return 0 if ok else 1
+
+
+def cmd_schedule(args):
+    import scheduler
+
+    scheduler.main()
+    return 0
+
+
+def cmd_status(args):
+    from history import History
+    from scheduler import load_plans, fmt
+
+    h = History()
+    # 单账号模式的计划键是 ""，运行记录按 GH_USERNAME 记：统一成用户名，同一账号只打一行
+    key = lambda a: a or os.environ.get("GH_USERNAME", "")
+    latest = {}
+    for a, row in h.latest().items():
+        if key(a) not in latest or row[0] > latest[key(a)][0]:
+            latest[key(a)] = row
+    h.close()
+    plans = {key(a): p for a, p in load_plans().items()}
+    accounts = sorted(set(plans) | set(latest))
+    if not accounts:
+        print("还没有运行记录和执行计划")
+        return 0
+    for a in accounts:
+        name = a or "账号"
+        line = f"{name:<24}"
+        if a in latest:
+            finished, ok, path, err = latest[a]
+            line += f" {'✅' if ok else '❌'} {fmt(finished)} {path or '(已登录)'}{'  ' + err if err else ''}"
+        else:
+            line += " 暂无记录"
+        p = plans.get(a)
+        if p:
+            line += f"\n{'':<24} 下次 {p['action']} @ {fmt(p['at'])}（{p['reason']}）"
+        print(line)
+    return 0
+
+
+def cmd_startup(args):
+    """每个场景起 runs 个新解释器取中位数，并列出导入了哪些重量级依赖"""
+    import shutil
+    import tempfile
+    import subprocess
+
+    me = os.path.abspath(__file__)
+    cases = [
+        ("python（基线）", ["-c", "pass"]),
+        ("claw --help", [me, "--help"]),
+        ("claw status", [me, "status"]),
+        ("import scheduler", ["-c", f"import sys; sys.path[:0] = [{HERE!r}, {_VPS!r}]; import scheduler"]),
+        ("import auto_login", ["-c", f"import sys; sys.path.insert(0, {HERE!r}); import auto_login"]),
+        ("import playwright", ["-c", "import playwright.sync_api"]),
+    ]
+    tmp = tempfile.mkdtemp(prefix="claw-startup-")  # status 会建 .claw/history.db，不污染当前目录
+    try:
+        print(f"{'场景':<22}{'中位数':>10}{'最慢':>10}  重量级依赖")
+        for name, argv in cases:
+            walls = []
+            for _ in range(args.runs):
+                t = time.perf_counter()
+                subprocess.run([sys.executable, *argv], cwd=tmp, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+                walls.append((time.perf_counter() - t) * 1000)
+            r = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=tmp, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE, text=True)
+            loaded = sorted({line.rsplit("|", 1)[-1].strip().split(".")[0] for line in r.stderr.splitlines()
+                             if line.startswith("import time:")} & set(HEAVY))
+            walls.sort()
+            print(f"{name:<22}{walls[len(walls) // 2]:>8.1f}ms{walls[-1]:>8.1f}ms  {', '.join(loaded) or '-'}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="ClawCloud 自动登录 / 保活")
+    sub = ap.add_subparsers(dest="cmd")
+    lp = sub.add_parser("login", help="完整浏览器登录")
+    lp.add_argument("account", nargs="?", default="")
+    lp.add_argument("--force", action="store_true", help="不因近期成功跳过")
+    pp = sub.add_parser("probe", help="不开浏览器的会话检查 / 保活")
+    pp.add_argument("account", nargs="?", default="")
+    pp.add_argument("--api", action="store_true", help="请求 ClawCloud 保活接口（CLAW_KEEPALIVE_API）")
+    sub.add_parser("schedule", help="常驻调度")
+    sub.add_parser("status", help="最近一次运行和下次计划")
+    sp = sub.add_parser("startup", help="启动耗时基准")
+    sp.add_argument("--runs", type=int, default=10)
+    args = ap.parse_args(argv)
+    if not args.cmd:
+        ap.print_help()
+        return 1
+    return globals()[f"cmd_{args.cmd}"](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+时钟：轮询循环里的 time() / sleep() / 等事件都经过它，换成 FakeClock 就能在毫秒内跑完几分钟的等待
+（见 harness.py）
+"""
+
+import time
+
+
+class Clock:
+    """真实时钟"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """等 threading.Event，返回是否已 set"""
+        return event.wait(timeout)
+
+
+class FakeClock(Clock):
+    """假时钟：sleep / wait 只把时间往前拨，不真的等"""
+
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+        self.start = start
+        self.sleeps = []  # 每次 sleep 的秒数
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(0, seconds)
+
+    def wait(self, event, timeout):
+        if not event.is_set():
+            self.sleep(timeout)
+        return event.is_set()
+
+    def elapsed(self):
+        return self.now - self.start
+
+
+CLOCK = Clock()
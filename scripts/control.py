@@ -0,0 +1,86 @@
+"""
+Telegram 控制机器人（scheduler.py 里常驻）：
+    /run [账号]   立即完整登录（忽略近期成功跳过）
+    /status       运行中 / 暂停状态 / 各账号最近结果
+    /next         各账号的下次执行计划
+    /pause        暂停定时执行（/run 仍可用）
+    /resume       恢复定时执行
+和 2FA 的 /code 共用同一个 getUpdates 消费者（tghook.hub），只接受 TG_CHAT_ID 发来的命令。
+命令放进队列并唤醒调度循环，由调度线程处理，不和调度状态抢锁；
+回复放进另一个队列由后台线程发送（限流 / 429 时可能要等几分钟，不能卡住调度循环）
+"""
+
+import os
+import re
+import queue
+import threading
+
+import tghook
+import tglimit
+
+CONTROL_ENABLED = os.environ.get("CLAW_CONTROL", "1") != "0"
+COMMANDS = ("run", "status", "next", "pause", "resume")
+
+
+class Control:
+    """收命令 -> 队列 -> 调度循环 take() 处理 -> reply() 入队 -> 后台线程发送"""
+
+    def __init__(self, token=None, chat_id=None, api=None, wake=None):
+        self.token = token or os.environ.get("TG_BOT_TOKEN")
+        self.chat_id = chat_id or os.environ.get("TG_CHAT_ID")
+        self.api = api or os.environ.get("TG_API_BASE", "https://api.telegram.org")
+        self.ok = bool(CONTROL_ENABLED and self.token and self.chat_id)
+        self.wake = wake or threading.Event()  # 收到命令时 set，调度循环在它上面睡
+        self.q = queue.Queue()
+        self.out = queue.Queue()  # 待发送的回复
+        self.paused = False
+
+    def start(self):
+        if not self.ok:
+            return self
+        hub = tghook.hub(self.token, self.api)
+        threading.Thread(target=self._loop, args=(hub,), name="tg-control", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="tg-control-reply", daemon=True).start()
+        print("🎛️ Telegram 控制已启用: /run /status /next /pause /resume")
+        return self
+
+    def parse(self, upd):
+        """(命令, 参数)；不是本 chat 的命令返回 None（/code 留给 wait_code）"""
+        msg = upd.get("message") or {}
+        if str((msg.get("chat") or {}).get("id")) != str(self.chat_id):
+            return None
+        m = re.match(r"^/(\w+)(?:@\w+)?(?:\s+(.*))?$", (msg.get("text") or "").strip())
+        if not m or m.group(1) not in COMMANDS:
+            return None
+        return m.group(1), (m.group(2) or "").strip()
+
+    def _loop(self, hub):
+        after = hub.cursor()
+        while True:
+            for seq, upd in hub.read(after, 3600):
+                after = seq
+                cmd = self.parse(upd)
+                if cmd:
+                    self.q.put(cmd)
+                    self.wake.set()
+
+    def take(self):
+        """取出全部待处理命令"""
+        cmds = []
+        while True:
+            try:
+                cmds.append(self.q.get_nowait())
+            except queue.Empty:
+                return cmds
+
+    def reply(self, text):
+        """不等发送完成就返回"""
+        self.out.put(text)
+
+    def _send_loop(self):
+        while True:
+            text = self.out.get()
+            try:
+                tglimit.post(self.api, self.token, "sendMessage", self.chat_id, {"text": text})
+            except Exception as e:
+                print(f"控制命令回复发送失败: {e}")
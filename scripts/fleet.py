@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+多节点分片：多台 VPS 上的 scheduler.py 共用一个 SQLite 租约表（放在共享存储上，CLAW_FLEET_DB）
+- 节点每 CLAW_FLEET_HEARTBEAT 秒写一次心跳，超过 CLAW_FLEET_NODE_TTL 秒没心跳视为下线
+- 账号固定分给一个节点（出口 IP 稳定）；只有节点下线或新账号才重新分配，分给负载最低的存活节点
+  新加入的节点不会接走已分配的账号（换出口 IP 会触发设备验证），只接新账号和下线节点的账号；
+  要均衡现有账号，先停掉负载高的节点超过 CLAW_FLEET_NODE_TTL 秒再启动
+- 执行前再对账号加执行租约，交接期间也不会两个节点同时登录同一账号
+
+用法：
+    python fleet.py status
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+FLEET_DB = os.environ.get("CLAW_FLEET_DB", "")
+NODE_ID = os.environ.get("CLAW_NODE_ID", socket.gethostname())
+HEARTBEAT = float(os.environ.get("CLAW_FLEET_HEARTBEAT", "30"))
+NODE_TTL = float(os.environ.get("CLAW_FLEET_NODE_TTL", "120"))
+RUN_LEASE = float(os.environ.get("CLAW_FLEET_RUN_LEASE", "1200"))  # 执行租约，节点崩溃后自动失效
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL,
+    capacity INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    account TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    since REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    account TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+class Coordinator:
+    """节点间的账号分配与执行租约（每次操作一个短连接，可跨线程使用）"""
+
+    def __init__(self, path=FLEET_DB, node=NODE_ID, capacity=1):
+        self.path = path
+        self.node = node
+        self.capacity = max(1, capacity)
+        self.stop = threading.Event()
+        db = sqlite3.connect(path, timeout=30)
+        db.executescript(SCHEMA)
+        db.close()
+
+    @contextmanager
+    def _db(self):
+        """写事务：BEGIN IMMEDIATE 让各节点的分配串行进行"""
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def heartbeat(self, now=None):
+        with self._db() as db:
+            db.execute("INSERT INTO nodes (node, heartbeat, capacity) VALUES (?, ?, ?) "
+                       "ON CONFLICT (node) DO UPDATE SET heartbeat = excluded.heartbeat, "
+                       "capacity = excluded.capacity",
+                       (self.node, now or time.time(), self.capacity))
+
+    def start(self):
+        """后台心跳（守护线程）"""
+        def loop():
+            while not self.stop.is_set():
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"⚠️ 心跳失败: {e}")
+                self.stop.wait(HEARTBEAT)
+
+        self.heartbeat()
+        t = threading.Thread(target=loop, name="fleet-heartbeat", daemon=True)
+        t.start()
+        return t
+
+    def rebalance(self, accounts, now=None):
+        """
+        把没有节点（新账号 / 原节点下线）的账号分给负载最低的存活节点，
+        已在存活节点上的账号不动；返回本节点负责的账号
+        """
+        now = now or time.time()
+        accounts = list(accounts)
+        with self._db() as db:
+            alive = {n: c for n, c in db.execute(
+                "SELECT node, capacity FROM nodes WHERE heartbeat >= ?", (now - NODE_TTL,))}
+            alive.setdefault(self.node, self.capacity)
+            current = dict(db.execute("SELECT account, node FROM assignments"))
+            load = {n: 0 for n in alive}
+            for acc, n in current.items():
+                if acc in accounts and n in alive:
+                    load[n] += 1
+
+            moved = []
+            for acc in accounts:
+                if current.get(acc) in alive:
+                    continue
+                # 按容量加权的负载最低者；平手按节点名，保证各节点算出同样的结果
+                n = min(alive, key=lambda x: (load[x] / alive[x], x))
+                load[n] += 1
+                db.execute("INSERT INTO assignments (account, node, since) VALUES (?, ?, ?) "
+                           "ON CONFLICT (account) DO UPDATE SET node = excluded.node, since = excluded.since",
+                           (acc, n, now))
+                if acc in current:
+                    moved.append((acc, current[acc], n))
+                current[acc] = n
+
+            gone = [a for a in current if a not in accounts]
+            db.executemany("DELETE FROM assignments WHERE account = ?", [(a,) for a in gone])
+
+        for acc, old, new in moved:
+            print(f"🔀 节点 {old} 已下线，{acc or '账号'} 改由 {new} 负责")
+        return [a for a in accounts if current.get(a) == self.node]
+
+    def claim(self, account, ttl=RUN_LEASE, now=None):
+        """执行前加租约：账号仍归本节点、且没有别的节点在执行"""
+        now = now or time.time()
+        with self._db() as db:
+            row = db.execute("SELECT node FROM assignments WHERE account = ?", (account,)).fetchone()
+            if not row or row[0] != self.node:
+                return False
+            cur = db.execute("UPDATE leases SET node = ?, until = ? WHERE account = ? AND (node = ? OR until < ?)",
+                             (self.node, now + ttl, account, self.node, now))
+            if cur.rowcount:
+                return True
+            cur = db.execute("INSERT OR IGNORE INTO leases (account, node, until) VALUES (?, ?, ?)",
+                             (account, self.node, now + ttl))
+            return cur.rowcount == 1
+
+    def release(self, account):
+        with self._db() as db:
+            db.execute("DELETE FROM leases WHERE account = ? AND node = ?", (account, self.node))
+
+    def status(self, now=None):
+        """[(节点, 是否存活, 容量, 账号数, 执行中)]"""
+        now = now or time.time()
+        with self._db() as db:
+            nodes = db.execute("SELECT node, heartbeat, capacity FROM nodes ORDER BY node").fetchall()
+            count = dict(db.execute("SELECT node, COUNT(*) FROM assignments GROUP BY node"))
+            busy = dict(db.execute("SELECT node, COUNT(*) FROM leases WHERE until >= ? GROUP BY node", (now,)))
+        return [(n, hb >= now - NODE_TTL, cap, count.get(n, 0), busy.get(n, 0)) for n, hb, cap in nodes]
+
+
+def main(argv):
+    if not FLEET_DB:
+        print("未配置 CLAW_FLEET_DB")
+        return 1
+    if argv[:1] != ["status"]:
+        print(__doc__)
+        return 1
+    for node, alive, cap, n, busy in Coordinator().status():
+        print(f"{'🟢' if alive else '🔴'} {node:<24} 容量 {cap}  账号 {n:>4}  执行中 {busy}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+"""
+轮询循环的假时钟 + 脚本化假页面：不开浏览器、不联网，几分钟的等待（设备验证、Mobile 两步验证、
+等 /code、按导航驱动的整个登录流程）在毫秒内跑完，并核对超时、刷新频率、截图频率是否符合预期
+
+- FakePage：按时间表切换 URL；selector 在 URL 含指定片段时可见；点击 / 回车按脚本跳转
+- FakeTelegram：按时间表收到消息，发出的消息 / 图片记到 outbox
+- harness(clock)：接好假时钟、临时截图目录、默认超时的 AutoLogin
+- scheduler(clock)：在假时钟上跑 VPS/scheduler.py 的主循环（假登录、同步执行、不起后台线程），核对排期和有没有空转
+- FakeBotAPI：本机假 Bot API（setWebhook / deleteWebhook / getUpdates），配合 TG_API_BASE 跑 Webhook / 长轮询往返
+- proxy_assign_race：多进程 x 多线程同时分配代理，核对 .claw/proxies.json 里的粘性分配一条不丢
+
+用法：
+    python harness.py bench [--runs 20]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import bisect
+import shutil
+import signal
+import socket
+import argparse
+import threading
+import tempfile
+import multiprocessing
+import concurrent.futures
+from contextlib import contextmanager, redirect_stdout
+
+import lease
+import proxies
+import tghook
+from clock import FakeClock
+from history import History
+from artifacts import ShotStore
+from timeouts import Timeouts
+import auto_login
+from auto_login import (AutoLogin, Telegram, SIGNIN_URL, CLAW_CLOUD_URL,
+                        ST_CLAW_SIGNIN, ST_GH_LOGIN, ST_DEVICE, ST_OAUTH)
+
+GH = "https://github.com"
+DEVICE_URL = f"{GH}/sessions/verified-device"
+MOBILE_URL = f"{GH}/sessions/two-factor/mobile"
+CODE_URL = f"{GH}/sessions/two-factor/app"
+LOGIN_URL = f"{GH}/login?client_id=claw"
+OAUTH_URL = f"{GH}/login/oauth/authorize?client_id=claw"
+CONSOLE_URL = f"{CLAW_CLOUD_URL}/"
+HOUR = 3600
+
+# 仓库内运行时从 VPS/ 找 scheduler.py；部署时两者在同一目录
+_VPS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "VPS")
+if os.path.isdir(_VPS):
+    sys.path.append(_VPS)
+
+
+class _Frame:
+    parent_frame = None
+
+    def __init__(self, url):
+        self.url = url
+
+
+class _Keyboard:
+    def __init__(self, page):
+        self.page = page
+
+    def press(self, key):
+        self.page._act("press", key)
+        if key in self.page.clicks:
+            self.page._schedule(self.page.clicks[key])
+
+
+class _Locator:
+    def __init__(self, page, sel):
+        self.page = page
+        self.parts = [s.strip() for s in sel.split(", ")]
+
+    @property
+    def first(self):
+        return self
+
+    def _hit(self):
+        """当前可见的第一个 selector"""
+        for s in self.parts:
+            frag = self.page.visible.get(s)
+            if frag is not None and frag in self.page.url:
+                return s
+        return None
+
+    def is_visible(self, timeout=None):
+        return self._hit() is not None
+
+    def wait_for(self, state="visible", timeout=30000):
+        self.page._wait(lambda: self._hit() is not None, timeout)
+
+    def click(self, timeout=30000):
+        self.wait_for(timeout=timeout)
+        s = self._hit()
+        self.page._act("click", s)
+        if s in self.page.clicks:
+            self.page._schedule(self.page.clicks[s])
+
+    def fill(self, value, timeout=30000):
+        self.wait_for(timeout=timeout)
+        self.page.filled[self._hit()] = value
+        self.page._act("fill", self._hit())
+
+    def inner_text(self, timeout=30000):
+        self.wait_for(timeout=timeout)
+        return "Incorrect username or password."
+
+
+class FakePage:
+    """
+    脚本化页面（只实现 AutoLogin 用到的部分）
+    timeline：[(秒, url)] 到点自动跳转（例如第 42 秒批准设备验证）
+    visible：{selector: URL 片段} 当前 URL 含该片段时可见（"" 为一直可见）
+    clicks：{selector 或 "Enter": url} 点击 / 回车后 latency 秒跳转
+    """
+
+    def __init__(self, clock, timeline, visible=None, clicks=None, latency=0.2):
+        self.clock = clock
+        self.t0 = clock.time()
+        self.pending = sorted((self.t0 + t, url) for t, url in timeline)
+        self.visible = visible or {}
+        self.clicks = clicks or {}
+        self.latency = latency
+        self.url = "about:blank"
+        self.handlers = {}
+        self.actions = []  # (秒, 动作, 参数)
+        self.filled = {}
+        self.keyboard = _Keyboard(self)
+        self._sync()
+
+    # ---------- 脚本 ----------
+
+    def _act(self, name, arg=""):
+        self.actions.append((round(self.clock.time() - self.t0, 3), name, arg))
+
+    def _schedule(self, url, delay=None):
+        bisect.insort(self.pending, (self.clock.time() + (self.latency if delay is None else delay), url))
+
+    def _navigate(self, url):
+        self.url = url
+        self._act("nav", url)
+        for fn in self.handlers.get("framenavigated", []):
+            fn(_Frame(url))
+
+    def _sync(self):
+        while self.pending and self.pending[0][0] <= self.clock.time():
+            self._navigate(self.pending.pop(0)[1])
+
+    def _wait(self, cond, timeout):
+        """拨动时钟直到 cond() 成立；超时抛 PlaywrightTimeout（timeout 为毫秒）"""
+        end = self.clock.time() + timeout / 1000
+        while True:
+            self._sync()
+            if cond():
+                return
+            nxt = self.pending[0][0] if self.pending else None
+            if nxt is None or nxt > end:
+                self.clock.sleep(end - self.clock.time())
+                self._sync()
+                if cond():
+                    return
+                raise auto_login.PlaywrightTimeout(f"Timeout {timeout:.0f}ms exceeded.")  # 与 AutoLogin 捕获的一致
+            self.clock.sleep(nxt - self.clock.time())
+
+    def count(self, name):
+        return sum(1 for a in self.actions if a[1] == name)
+
+    # ---------- Page API ----------
+
+    def on(self, event, fn):
+        self.handlers.setdefault(event, []).append(fn)
+
+    def goto(self, url, timeout=30000, **kw):
+        self._schedule(url)
+        self._wait(lambda: self.url == url, timeout)
+
+    def reload(self, timeout=30000, **kw):
+        self._act("reload")
+        self.clock.sleep(self.latency)
+        self._sync()
+        self._navigate(self.url)
+
+    def wait_for_load_state(self, state="load", timeout=30000):
+        self.clock.sleep(self.latency)
+        self._sync()
+
+    def wait_for_url(self, predicate, timeout=30000):
+        self._wait(lambda: predicate(self.url), timeout)
+
+    def wait_for_event(self, event, predicate=None, timeout=30000):
+        n = self.count("nav")
+        self._wait(lambda: self.count("nav") > n, timeout)
+
+    def locator(self, sel):
+        return _Locator(self, sel)
+
+    def screenshot(self, **kw):
+        self._act("shot")
+        return self.url.encode()
+
+    def evaluate(self, js):
+        return {"url": self.url, "ttfb": 0, "dcl": 0, "load": 0, "transfer": 0, "resources": 0,
+                "resource_bytes": 0, "slowest": []}
+
+
+class FakeTelegram(Telegram):
+    """messages：[(秒, 文本)] 按时间收到的消息；发出的记到 outbox"""
+
+    def __init__(self, clock, messages=(), chat_id="1"):
+        super().__init__(None, clock)
+        self.token, self.chat_id, self.ok = "harness", chat_id, True
+        self.t0 = clock.time()
+        self.inbox = [(self.t0 + t, {"update_id": i + 1, "message": {"chat": {"id": int(chat_id)}, "text": text}})
+                      for i, (t, text) in enumerate(sorted(messages))]
+        self.outbox = []  # (秒, "text" / "photo", 内容)
+
+    def _send(self, msg, priority="normal"):
+        self.outbox.append((round(self.clock.time() - self.t0, 3), "text", msg))
+
+    def _photo(self, path, caption="", priority="normal"):
+        self.outbox.append((round(self.clock.time() - self.t0, 3), "photo", caption))
+
+    def get_updates(self, offset=None, poll=0):
+        end = self.clock.time() + poll
+        while True:
+            now = self.clock.time()
+            ready = [u for t, u in self.inbox if t <= now and u["update_id"] >= (offset or 0)]
+            if ready or now >= end:
+                return {"ok": True, "result": ready}
+            nxt = min([t for t, _ in self.inbox if t > now] + [end])
+            self.clock.sleep(nxt - now)
+
+
+class FakeBotAPI:
+    """
+    本机假 Bot API：记录 Webhook，有 Webhook 时 getUpdates 返回 409（和真的一样），
+    deliver() 按当前模式推送到 Webhook 或放进 getUpdates 队列
+    """
+
+    def __init__(self, token="harness"):
+        self.token = token
+        self.webhook = None  # (url, secret)
+        self.updates = []
+        self.cond = threading.Condition()
+        self.conflicts = 0  # 返回过几次 409
+        self.polls = 0  # 带 offset 的 getUpdates 次数
+        self.registered = 0  # setWebhook 次数
+        self.server = None
+
+    def start(self):
+        from urllib.parse import urlparse, parse_qs
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, params):
+                method = self.path.split("?")[0].rsplit("/", 1)[-1]
+                status, body = api.call(method, {k: v[-1] for k, v in params.items()})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle(parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                self._handle(parse_qs(body))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), name="fake-bot-api", daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def call(self, method, params):
+        with self.cond:
+            if method == "setWebhook":
+                self.webhook = (params["url"], params.get("secret_token", ""))
+                self.registered += 1
+            elif method == "deleteWebhook":
+                self.webhook = None
+            elif method == "getUpdates":
+                if self.webhook:
+                    self.conflicts += 1
+                    return 409, {"ok": False, "error_code": 409,
+                                 "description": "Conflict: can't use getUpdates method while webhook is active"}
+                offset = int(params.get("offset", 0))
+                if offset == -1:
+                    return 200, {"ok": True, "result": self.updates[-1:]}
+                self.polls += 1
+                ready = [u for u in self.updates if u["update_id"] >= offset]
+                if not ready:
+                    self.cond.wait(0.05)  # 长轮询缩短成 50ms
+                    ready = [u for u in self.updates if u["update_id"] >= offset]
+                return 200, {"ok": True, "result": ready}
+            return 200, {"ok": True, "result": True}
+
+    def deliver(self, text, chat_id="1"):
+        import requests
+
+        with self.cond:
+            upd = {"update_id": len(self.updates) + 1, "message": {"chat": {"id": int(chat_id)}, "text": text}}
+            self.updates.append(upd)
+            self.cond.notify_all()
+            hook = self.webhook
+        if hook:
+            requests.post(hook[0], json=upd, headers={"X-Telegram-Bot-Api-Secret-Token": hook[1]}, timeout=5)
+
+
+def _until(cond, timeout=5.0):
+    end = time.time() + timeout
+    while not cond() and time.time() < end:
+        time.sleep(0.002)
+
+
+def harness(clock, tmp, tg=None):
+    """不开浏览器的 AutoLogin：假时钟、截图写 tmp、默认超时、不写日志文件和 Secret"""
+    a = AutoLogin(clock=clock)
+    a.username, a.password, a.totp = "harness", "harness", ""
+    a.tg = tg or FakeTelegram(clock)
+    a.secret.ok = False
+    a.sink = None
+    a.store = ShotStore("harness", root=tmp)
+    a.to = Timeouts(path=os.path.join(tmp, "timeouts.json"), deadline=a.deadline, clock=clock)
+    return a
+
+
+# ---------- 场景：返回 (结果, 期望) ----------
+
+def device_approved(clock, tmp):
+    page = FakePage(clock, [(0, DEVICE_URL), (17, CONSOLE_URL)])
+    a = harness(clock, tmp)
+    ok = a.wait_device(page)
+    # 每 5 秒没跳走刷新一次：5.0 / 10.2 / 15.4
+    return {"ok": ok, "reloads": page.count("reload"), "t": clock.elapsed()}, \
+        {"ok": True, "reloads": 3, "t": (17, 17.1)}
+
+
+def device_timeout(clock, tmp):
+    page = FakePage(clock, [(0, DEVICE_URL)])
+    a = harness(clock, tmp)
+    ok = a.wait_device(page)
+    return {"ok": ok, "reloads": page.count("reload"), "t": clock.elapsed()}, \
+        {"ok": False, "reloads": 6, "t": (30, 32)}
+
+
+def mobile_approved(clock, tmp):
+    page = FakePage(clock, [(0, MOBILE_URL), (75, CONSOLE_URL)])
+    tg = FakeTelegram(clock)
+    a = harness(clock, tmp, tg)
+    ok = a.wait_two_factor_mobile(page)
+    # 进页面截一张 + 每 10 秒补一张；30 / 60 秒各轻刷新一次
+    return {"ok": ok, "shots": page.count("shot"), "reloads": page.count("reload"),
+            "photos": sum(1 for m in tg.outbox if m[1] == "photo"), "t": clock.elapsed()}, \
+        {"ok": True, "shots": 8, "reloads": 2, "photos": 8, "t": (75, 75.1)}
+
+
+def mobile_timeout(clock, tmp):
+    page = FakePage(clock, [(0, MOBILE_URL)])
+    a = harness(clock, tmp)
+    ok = a.wait_two_factor_mobile(page)
+    return {"ok": ok, "shots": page.count("shot"), "reloads": page.count("reload"), "t": clock.elapsed()}, \
+        {"ok": False, "shots": 12, "reloads": 3, "t": (120, 122)}
+
+
+def code_via_telegram(clock, tmp):
+    page = FakePage(clock, [(0, CODE_URL)],
+                    visible={'input[name="app_otp"]': "two-factor", 'button:has-text("Verify")': "two-factor"},
+                    clicks={'button:has-text("Verify")': CONSOLE_URL})
+    tg = FakeTelegram(clock, [(3, "/code 12345"), (50, "/code 123456")])
+    a = harness(clock, tmp, tg)
+    ok = a.handle_2fa_code_input(page)
+    return {"ok": ok, "code": page.filled.get('input[name="app_otp"]'), "t": clock.elapsed()}, \
+        {"ok": True, "code": "123456", "t": (51, 51.5)}
+
+
+def drive_full(clock, tmp):
+    page = FakePage(clock, [(0, SIGNIN_URL), (20, OAUTH_URL)],
+                    visible={'button:has-text("GitHub")': "signin", 'input[name="login"]': "/login?",
+                             'input[name="password"]': "/login?", 'button[type="submit"]': "/login?",
+                             'button[name="authorize"]': "oauth/authorize"},
+                    clicks={'button:has-text("GitHub")': LOGIN_URL, 'button[type="submit"]': DEVICE_URL,
+                            'button[name="authorize"]': CONSOLE_URL})
+    a = harness(clock, tmp)
+    page.on("framenavigated", a.on_nav)
+    ok = a.drive(page)
+    return {"ok": ok, "path": ">".join(a.path), "reloads": page.count("reload"), "t": clock.elapsed()}, \
+        {"ok": True, "path": ">".join([ST_CLAW_SIGNIN, ST_GH_LOGIN, ST_DEVICE, ST_OAUTH]), "reloads": 3,
+         "t": (20, 22)}
+
+
+class _Stop(Exception):
+    pass
+
+
+class _Inline:
+    """代替 ThreadPoolExecutor：submit 时就地执行，结果确定、不起线程"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def submit(self, fn, *args):
+        fut = concurrent.futures.Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+
+@contextmanager
+def _patched(*patches):
+    """[(对象, 属性, 值)] 临时替换，退出时还原"""
+    old = [(obj, name, getattr(obj, name)) for obj, name, _ in patches]
+    try:
+        for obj, name, value in patches:
+            setattr(obj, name, value)
+        yield
+    finally:
+        for obj, name, value in reversed(old):
+            setattr(obj, name, value)
+
+
+def scheduler(clock, tmp, login, probe=None, state=None, hours=24, max_loops=500):
+    """
+    在假时钟上跑 hours 小时的 scheduler.main()：单账号 harness、保存的会话为 state、不开控制机器人 / 多节点 / 代理；
+    login(clock, history) 代替完整登录，probe(clock) 代替 probe。
+    返回 ([(动作, 时刻（小时）)], 循环次数)；超过 max_loops 次循环视为空转
+    """
+    import scheduler as sched
+    import policy
+    import proxies
+    import control
+    import fleet
+    import metrics
+
+    history = History(os.path.join(tmp, "history.db"))
+    runs, loops = [], [0]
+
+    def fake_login(account, force=False):
+        runs.append(("login", round(clock.elapsed() / HOUR, 2)))
+        return login(clock, history)
+
+    def fake_probe(account):
+        runs.append(("probe", round(clock.elapsed() / HOUR, 2)))
+        return probe(clock)
+
+    def wait(event, timeout):
+        loops[0] += 1
+        if loops[0] > max_loops or clock.elapsed() >= hours * HOUR:
+            raise _Stop
+        return FakeClock.wait(clock, event, timeout)
+
+    sigterm = signal.getsignal(signal.SIGTERM)
+    try:
+        with _patched((sched, "STATE_FILE", os.path.join(tmp, "plans.json")),
+                      (sched, "History", lambda: History(os.path.join(tmp, "history.db"))),
+                      (sched, "accounts", lambda: ["harness"]),
+                      (sched, "login", fake_login),
+                      (policy, "load_state", lambda account: state),
+                      (policy, "probe", fake_probe),
+                      (proxies, "PROXIES", ""),
+                      (control, "CONTROL_ENABLED", False),
+                      (fleet, "FLEET_DB", ""),
+                      (metrics, "serve", lambda **kw: None),
+                      (concurrent.futures, "ThreadPoolExecutor", _Inline),
+                      (clock, "wait", wait)):
+            sched.main(clock=clock)
+    except _Stop:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, sigterm)
+        history.close()
+    return runs, loops[0]
+
+
+def scheduler_skipped(clock, tmp):
+    # 别处（Actions）刚登录成功：每次都被 recent_success 跳过，应按 CLAW_SUCCESS_TTL 重排，不能原地空转
+    ttl = lease.SUCCESS_TTL * HOUR
+    runs, loops = scheduler(clock, tmp, lambda c, h: lease.Skipped(c.time() + ttl, "近期已登录成功"))
+    n = int(24 * HOUR // ttl) + 1
+    return {"runs": runs, "spin": loops >= 500, "t": clock.elapsed()}, \
+        {"runs": [("login", round(i * ttl / HOUR, 2)) for i in range(n)], "spin": False, "t": (24 * HOUR, 25 * HOUR)}
+
+
+def scheduler_stateless(clock, tmp):
+    # 登录成功但没有保存的会话：下一次按不活跃阈值排，不能每个周期都重新登录
+    def login(c, h):
+        h.record("harness", "harness", True, c.time(), {}, path="harness", finished=c.time())
+        return True
+
+    runs, loops = scheduler(clock, tmp, login)
+    return {"runs": runs, "spin": loops >= 500, "t": clock.elapsed()}, \
+        {"runs": [("login", 0.0)], "spin": False, "t": (24 * HOUR, 25 * HOUR)}
+
+
+def scheduler_probe(clock, tmp):
+    # GitHub 会话 24 小时后到期，probe 成功但没有续期：按 CLAW_RECHECK_HOURS 间隔再探，来不及时改为完整登录
+    import policy
+
+    state = {"cookies": [{"name": "user_session", "domain": "github.com", "expires": clock.time() + 24 * HOUR}]}
+    h = History(os.path.join(tmp, "history.db"))
+    h.record("harness", "harness", True, clock.time() - 24 * HOUR, {}, path="harness", finished=clock.time() - 24 * HOUR)
+    h.close()
+
+    def login(c, h):
+        state["cookies"][0]["expires"] = c.time() + 14 * 24 * HOUR  # 完整登录拿到新会话
+        h.record("harness", "harness", True, c.time(), {}, path="harness", finished=c.time())
+        return True
+
+    runs, loops = scheduler(clock, tmp, login, probe=lambda c: True, state=state)
+    step = policy.RECHECK_HOURS
+    probes = [("probe", round(i * step, 2)) for i in range(int(24 // step))]
+    return {"runs": runs, "spin": loops >= 500, "t": clock.elapsed()}, \
+        {"runs": probes + [("login", probes[-1][1])], "spin": False, "t": (24 * HOUR, 25 * HOUR)}
+
+
+def _assign_many(args):
+    """一个进程里多个线程同时分配，每个线程用自己的 ProxyPool（和 AutoLogin / probe 一样）"""
+    urls, path, accounts = args
+    with concurrent.futures.ThreadPoolExecutor(len(accounts)) as ex:
+        return list(ex.map(lambda a: proxies.ProxyPool(urls, path=path).assign(a), accounts))
+
+
+def proxy_assign_race(clock, tmp):
+    # 4 个进程 x 15 个线程同时给 60 个新账号分配代理：粘性分配一条都不能丢，负载要均匀
+    urls = [f"http://10.0.0.{i}:8080" for i in range(4)]
+    path = os.path.join(tmp, "proxies.json")
+    with open(path, "w") as f:
+        json.dump({"assign": {}, "health": {u: {"ok": True, "ms": 10 + i, "at": time.time()}
+                                           for i, u in enumerate(urls)}}, f)
+    accounts = [f"acc{i}" for i in range(60)]
+    chunks = [(urls, path, accounts[i::4]) for i in range(4)]
+    with multiprocessing.get_context("fork").Pool(4) as mp:
+        got = dict(zip(sum((c[2] for c in chunks), []), sum(mp.map(_assign_many, chunks), [])))
+    with open(path) as f:
+        saved = json.load(f)["assign"]
+    load = [list(saved.values()).count(u) for u in urls]
+    return {"saved": len(saved), "sticky": saved == got, "load": load, "t": clock.elapsed()}, \
+        {"saved": 60, "sticky": True, "load": [15] * 4, "t": 0}
+
+
+def tg_roundtrip(clock, tmp):
+    # 假 Bot API 上跑一遍：两个同时 wait_code 的登录共用一个 Webhook，先结束的不能把它删掉；
+    # 最后一个结束后 Webhook 删除，长轮询接着可用（没有 409）
+    fake = FakeBotAPI()
+    api = fake.start()
+    with socket.socket() as sk:
+        sk.bind(("127.0.0.1", 0))
+        port = sk.getsockname()[1]
+
+    def tg(chat):
+        t = Telegram(None, clock)
+        t.token, t.chat_id, t.api, t.ok = fake.token, chat, api, True
+        return t
+
+    codes = {}
+
+    def waiter(key, chat):
+        codes[key] = tg(chat).wait_code(timeout=5)
+
+    try:
+        with _patched((tghook, "WEBHOOK_URL", f"http://127.0.0.1:{port}/claw-tg"),
+                      (tghook, "WEBHOOK_LISTEN", f"127.0.0.1:{port}"),
+                      (tghook, "WEBHOOK_SECRET", "")):
+            threads = [threading.Thread(target=waiter, args=(k, c)) for k, c in (("a", "1"), ("b", "2"))]
+            for t in threads:
+                t.start()
+            _until(lambda: getattr(tghook._hooks.get(fake.token), "users", 0) == 2)
+            fake.deliver("/code 111111", "1")
+            threads[0].join(5)
+            fake.deliver("/code 222222", "2")
+            threads[1].join(5)
+            webhook_left = fake.webhook is not None
+
+            # 没有 Webhook 时常驻进程走长轮询，wait_code 复用它
+            tghook.hub(fake.token, api, url="")
+            _until(lambda: fake.polls > 0)
+            t = threading.Thread(target=waiter, args=("c", "1"))
+            t.start()
+            time.sleep(0.01)
+            fake.deliver("/code 333333", "1")
+            t.join(5)
+    finally:
+        tghook.unregister(fake.token, api)
+        fake.stop()
+    return {"codes": [codes.get(k) for k in "abc"], "registered": fake.registered, "webhook_left": webhook_left,
+            "conflicts": fake.conflicts, "t": clock.elapsed()}, \
+        {"codes": ["111111", "222222", "333333"], "registered": 1, "webhook_left": False, "conflicts": 0, "t": 0}
+
+
+SCENARIOS = [device_approved, device_timeout, mobile_approved, mobile_timeout, code_via_telegram, drive_full,
+             scheduler_skipped, scheduler_stateless, scheduler_probe, proxy_assign_race,
+             tg_roundtrip]
+
+
+def check(got, want):
+    """不符合期望的项；t 为 (下限, 上限)"""
+    bad = []
+    for k, v in want.items():
+        g = got.get(k)
+        if (isinstance(v, tuple) and not v[0] <= g <= v[1]) or (not isinstance(v, tuple) and g != v):
+            bad.append(f"{k}={g!r}（期望 {v!r}）")
+    return bad
+
+
+def bench(runs=20):
+    failed = 0
+    print(f"{'场景':<20} {'模拟':>8} {'实际':>9}  结果")
+    for fn in SCENARIOS:
+        walls, got, want = [], None, None
+        for _ in range(runs):
+            tmp = tempfile.mkdtemp(prefix="claw-harness-")
+            try:
+                clock = FakeClock()
+                t = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    got, want = fn(clock, tmp)
+                walls.append(time.perf_counter() - t)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        bad = check(got, want)
+        failed += bool(bad)
+        walls.sort()
+        print(f"{fn.__name__:<20} {got['t']:>7.1f}s {walls[len(walls) // 2] * 1000:>7.2f}ms  "
+              f"{'✅' if not bad else '❌ ' + '; '.join(bad)}")
+    return 1 if failed else 0
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="轮询循环基准（假时钟 + 假页面）")
+    ap.add_argument("cmd", choices=["bench"])
+    ap.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args(argv)
+    return bench(args.runs)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+运行历史（SQLite）
+- 每次运行：账号 / 区域 / 结果 / 各阶段耗时 / 验证路径 / 流量 / 错误
+- 报表：按账号 + 区域统计成功率和各阶段 p50/p95/p99
+- 流量：按阶段 + 域名的请求数、发送 / 接收字节、缓存命中
+- 页面计时：登录页 / 控制台 / 应用页的 Navigation Timing + Resource Timing，按区域检测变慢
+
+用法：
+    python history.py report [--days 7] [--account 账号] [--region 区域]
+    python history.py trends [--days 7] [--baseline 30] [--metric load] [--region 区域]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+HISTORY_DB = os.environ.get("CLAW_HISTORY_DB", os.path.join(STATE_DIR, "history.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    path TEXT NOT NULL DEFAULT '',
+    bytes INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stages_run ON stages (run_id);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    page TEXT NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    ttfb REAL,
+    dcl REAL,
+    load REAL,
+    transfer INTEGER,
+    resources INTEGER,
+    resource_bytes INTEGER,
+    slowest TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS pages_run ON pages (run_id);
+CREATE TABLE IF NOT EXISTS traffic (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    cached INTEGER NOT NULL,
+    sent INTEGER NOT NULL,
+    received INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traffic_run ON traffic (run_id);
+"""
+
+# 页面计时里可做趋势分析的指标（毫秒）
+PAGE_METRICS = ("ttfb", "dcl", "load")
+
+
+def percentile(values, p):
+    """线性插值分位数，values 需已排序"""
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def mann_whitney(a, b):
+    """单侧 Mann-Whitney U 检验（正态近似）：a 是否整体大于 b，返回 p 值"""
+    n1, n2 = len(a), len(b)
+    pooled = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks, i = [0.0] * len(pooled), 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1  # 并列取平均秩
+        i = j + 1
+    r1 = sum(r for r, (_, g) in zip(ranks, pooled) if g == 0)
+    u = r1 - n1 * (n1 + 1) / 2
+    sd = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    if not sd:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sd
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class History:
+    """运行历史"""
+
+    def __init__(self, path=HISTORY_DB):
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        # 多个进程同时写：WAL + busy_timeout
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record(self, account, region, ok, started, stages, path="", nbytes=0, error="", finished=None, pages=(),
+               traffic=()):
+        """
+        写入一次运行，stages 为 {阶段: 秒}，pages 为页面计时列表（见 AutoLogin.nav_timing），
+        traffic 为 [(阶段, 域名, 请求, 缓存, 发送, 接收)]（见 Traffic.rows）
+        """
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO runs (account, region, started, finished, ok, path, bytes, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (account, region, started, finished or time.time(), int(bool(ok)), path, int(nbytes), error or ""),
+            )
+            rid = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO stages (run_id, stage, seconds) VALUES (?, ?, ?)",
+                [(rid, k, float(v)) for k, v in stages.items()],
+            )
+            self.db.executemany(
+                "INSERT INTO pages (run_id, page, url, ttfb, dcl, load, transfer, resources, resource_bytes, slowest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(rid, p["page"], p.get("url", ""), p.get("ttfb"), p.get("dcl"), p.get("load"), p.get("transfer"),
+                  p.get("resources"), p.get("resource_bytes"), json.dumps(p.get("slowest", [])))
+                 for p in pages],
+            )
+            self.db.executemany(
+                "INSERT INTO traffic (run_id, stage, domain, requests, cached, sent, received) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(rid, *row) for row in traffic],
+            )
+        return rid
+
+    def last_success(self, account, exclude=("probe",)):
+        """最近一次成功（默认不算只探测 GitHub 会话的 probe）"""
+        marks = ",".join("?" * len(exclude)) or "''"
+        row = self.db.execute(
+            f"SELECT MAX(finished) FROM runs WHERE account = ? AND ok = 1 AND path NOT IN ({marks})",
+            (account, *exclude),
+        ).fetchone()
+        return row[0]
+
+    def latest(self):
+        """各账号最近一次运行 {账号: (结束时间, 是否成功, 路径, 错误)}"""
+        rows = self.db.execute(
+            "SELECT account, finished, ok, path, error FROM runs r WHERE finished = "
+            "(SELECT MAX(finished) FROM runs WHERE account = r.account)"
+        ).fetchall()
+        return {a: (f, bool(ok), path, err) for a, f, ok, path, err in rows}
+
+    def _where(self, since, account, region):
+        sql, args = ["r.started >= ?"], [since]
+        if account:
+            sql.append("r.account = ?")
+            args.append(account)
+        if region:
+            sql.append("r.region = ?")
+            args.append(region)
+        return " AND ".join(sql), args
+
+    def report(self, days=7, account=None, region=None):
+        """
+        返回 [{account, region, runs, ok, rate, paths, stages: {阶段: (n, p50, p95, p99)},
+               traffic: {"stages" / "domains": {名称: [请求, 缓存, 发送, 接收]}}}]（流量为每次运行平均）
+        """
+        where, args = self._where(time.time() - days * 86400, account, region)
+        groups = {}
+        for acc, reg, ok, path in self.db.execute(
+                f"SELECT r.account, r.region, r.ok, r.path FROM runs r WHERE {where}", args):
+            g = groups.setdefault((acc, reg), {"account": acc, "region": reg, "runs": 0, "ok": 0,
+                                               "paths": {}, "samples": {}})
+            g["runs"] += 1
+            g["ok"] += ok
+            g["paths"][path] = g["paths"].get(path, 0) + 1
+
+        for acc, reg, stage, sec in self.db.execute(
+                f"SELECT r.account, r.region, s.stage, s.seconds FROM stages s JOIN runs r ON r.id = s.run_id "
+                f"WHERE {where}", args):
+            groups[(acc, reg)]["samples"].setdefault(stage, []).append(sec)
+
+        for acc, reg, stage, domain, *vals in self.db.execute(
+                f"SELECT r.account, r.region, t.stage, t.domain, SUM(t.requests), SUM(t.cached), SUM(t.sent), "
+                f"SUM(t.received) FROM traffic t JOIN runs r ON r.id = t.run_id WHERE {where} "
+                f"GROUP BY r.account, r.region, t.stage, t.domain", args):
+            g = groups[(acc, reg)].setdefault("traffic", {"stages": {}, "domains": {}})
+            for key, name in (("stages", stage), ("domains", domain)):
+                t = g[key].setdefault(name, [0, 0, 0, 0])
+                for i, v in enumerate(vals):
+                    t[i] += v / groups[(acc, reg)]["runs"]
+
+        out = []
+        for key in sorted(groups):
+            g = groups[key]
+            g["rate"] = g["ok"] / g["runs"]
+            g["stages"] = {}
+            for stage, vals in sorted(g.pop("samples").items()):
+                vals.sort()
+                g["stages"][stage] = (len(vals), percentile(vals, 50), percentile(vals, 95), percentile(vals, 99))
+            out.append(g)
+        return out
+
+    def trends(self, days=7, baseline=30, metric="load", region=None, alpha=0.01, min_ratio=1.2, now=None):
+        """
+        各区域各页面：最近 days 天 vs 之前 baseline 天，检验是否显著变慢
+        返回 [{region, page, recent, base, p50, base_p50, ratio, p, slower}]
+        """
+        if metric not in PAGE_METRICS:
+            raise ValueError(f"未知指标: {metric}（可选 {', '.join(PAGE_METRICS)}）")
+        now = now or time.time()
+        split, start = now - days * 86400, now - (days + baseline) * 86400
+        sql = (f"SELECT r.region, p.page, r.started, p.{metric} FROM pages p JOIN runs r ON r.id = p.run_id "
+               f"WHERE r.started >= ? AND p.{metric} > 0")
+        args = [start]
+        if region:
+            sql += " AND r.region = ?"
+            args.append(region)
+        groups = {}
+        for reg, page, started, v in self.db.execute(sql, args):
+            g = groups.setdefault((reg, page), ([], []))
+            g[0 if started >= split else 1].append(v)
+
+        out = []
+        for (reg, page), (recent, base) in sorted(groups.items()):
+            if len(recent) < 5 or len(base) < 5:
+                continue
+            recent.sort()
+            base.sort()
+            p50, b50 = percentile(recent, 50), percentile(base, 50)
+            ratio = p50 / b50 if b50 else 1.0
+            p = mann_whitney(recent, base)
+            out.append({"region": reg, "page": page, "recent": len(recent), "base": len(base), "p50": p50,
+                        "base_p50": b50, "ratio": ratio, "p": p, "slower": p < alpha and ratio >= min_ratio})
+        return out
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="ClawCloud 运行历史")
+    sub = ap.add_subparsers(dest="cmd")
+    rp = sub.add_parser("report", help="成功率和各阶段耗时分位数")
+    rp.add_argument("--days", type=float, default=7)
+    rp.add_argument("--account")
+    rp.add_argument("--region")
+    rp.add_argument("--json", action="store_true", help="输出 JSON")
+    rp.add_argument("--db", default=HISTORY_DB)
+    tp = sub.add_parser("trends", help="页面计时是否显著变慢（按区域）")
+    tp.add_argument("--days", type=float, default=7, help="最近几天")
+    tp.add_argument("--baseline", type=float, default=30, help="和之前几天比较")
+    tp.add_argument("--metric", default="load", choices=PAGE_METRICS)
+    tp.add_argument("--region")
+    tp.add_argument("--db", default=HISTORY_DB)
+    args = ap.parse_args(argv)
+    if args.cmd == "trends":
+        h = History(args.db)
+        rows = h.trends(args.days, args.baseline, args.metric, args.region)
+        h.close()
+        if not rows:
+            print("样本不足（每组最近和基线各需 5 次以上）")
+        for t in rows:
+            flag = "🐢 变慢" if t["slower"] else "  正常"
+            print(f"{flag} {t['region']:<18}{t['page']:<10} {args.metric} p50 {t['base_p50']:>7.0f}ms -> "
+                  f"{t['p50']:>7.0f}ms（×{t['ratio']:.2f}，p={t['p']:.4f}，n={t['base']}/{t['recent']}）")
+        return 0
+    if args.cmd != "report":
+        ap.print_help()
+        return 1
+
+    h = History(args.db)
+    rows = h.report(args.days, args.account, args.region)
+    h.close()
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    if not rows:
+        print(f"最近 {args.days:g} 天没有记录")
+        return 0
+
+    for g in rows:
+        print(f"\n📊 {g['account']} @ {g['region']}  运行 {g['runs']} 次，成功率 {g['rate'] * 100:.1f}%")
+        print(f"  {'阶段':<24}{'n':>5}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for stage, (n, p50, p95, p99) in g["stages"].items():
+            print(f"  {stage:<24}{n:>5}{p50:>8.1f}s{p95:>8.1f}s{p99:>8.1f}s")
+        for path, n in sorted(g["paths"].items(), key=lambda x: -x[1])[:5]:
+            print(f"  路径 {path or '(已登录)'}: {n} 次")
+        traffic = g.get("traffic")
+        if traffic:
+            print(f"  {'流量（每次平均）':<20}{'请求':>7}{'缓存':>7}{'发送':>11}{'接收':>11}")
+            for key, label in (("stages", "阶段"), ("domains", "域名")):
+                for name, (reqs, cached, sent, recv) in sorted(traffic[key].items(), key=lambda x: -x[1][3])[:8]:
+                    print(f"  {label} {name:<19}{reqs:>7.1f}{cached:>7.1f}{sent / 1024:>9.1f}KB{recv / 1024:>9.1f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,167 @@
+"""
+同一账号同一时间只允许一个登录
+- 本机：.claw/locks/ 下按账号的文件锁（scheduler 和手动运行互斥）
+- 跨机器（可选，CLAW_GH_LEASE=1）：用仓库的 Actions 变量做租约，Actions 和 VPS 共用
+  需要 REPO_TOKEN + GITHUB_REPOSITORY；变量里同时记录最近一次成功时间
+
+最近 CLAW_SUCCESS_TTL 小时内已成功登录过的账号直接跳过（CLAW_FORCE=1 强制运行）；
+跳过时 AutoLogin.run() 返回 Skipped，调度器按其中的 until 重新排期
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+import hashlib
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+LOCK_DIR = os.path.join(STATE_DIR, "locks")
+SUCCESS_TTL = float(os.environ.get("CLAW_SUCCESS_TTL", "6"))  # 小时，0 为关闭
+LEASE_TTL = float(os.environ.get("CLAW_LEASE_TTL", "1200"))  # 秒，持有者崩溃后租约自动失效
+GH_LEASE = os.environ.get("CLAW_GH_LEASE") == "1"
+FORCE = os.environ.get("CLAW_FORCE") == "1"
+
+
+def _key(account):
+    return hashlib.sha1(account.encode()).hexdigest()[:12]
+
+
+def owner_id():
+    """本次运行的标识：Actions 用 run id，其它为 主机名:pid"""
+    run = os.environ.get("GITHUB_RUN_ID")
+    return f"actions:{run}" if run else f"{socket.gethostname()}:{os.getpid()}"
+
+
+class GitHubLease:
+    """Actions 变量租约：{"owner", "until", "ok"}；没有原子比较交换，写后回读确认"""
+
+    def __init__(self, account, token=None, repo=None):
+        self.token = token or os.environ.get("REPO_TOKEN")
+        self.repo = repo or os.environ.get("GITHUB_REPOSITORY")
+        self.name = f"CLAW_LEASE_{_key(account).upper()}"
+        self.ok = bool(self.token and self.repo)
+        self.owner = owner_id()
+        self.until = 0  # acquire 失败时：别人的租约到期时间
+
+    def _api(self, method, path="", **kw):
+        import requests
+
+        return requests.request(
+            method, f"https://api.github.com/repos/{self.repo}/actions/variables{path}",
+            headers={"Authorization": f"token {self.token}", "Accept": "application/vnd.github+json"},
+            timeout=15, **kw)
+
+    def read(self):
+        r = self._api("GET", f"/{self.name}")
+        if r.status_code != 200:
+            return {}
+        try:
+            return json.loads(r.json().get("value") or "{}")
+        except ValueError:
+            return {}
+
+    def write(self, value, exists=True):
+        body = {"name": self.name, "value": json.dumps(value)}
+        r = self._api("PATCH", f"/{self.name}", json=body) if exists else None
+        if r is None or r.status_code == 404:
+            r = self._api("POST", json=body)
+        return r.status_code in (201, 204)
+
+    def acquire(self):
+        cur = self.read()
+        if cur.get("owner") not in (None, self.owner) and cur.get("until", 0) > time.time():
+            self.until = cur["until"]
+            return False
+        if not self.write(dict(cur, owner=self.owner, until=time.time() + LEASE_TTL), exists=bool(cur)):
+            return True  # 写不进去（权限不足等）不阻塞登录
+        return self.read().get("owner") == self.owner
+
+    def release(self, ok=False):
+        cur = self.read()
+        if cur.get("owner") != self.owner:
+            return
+        value = {"ok": time.time() if ok else cur.get("ok", 0)}
+        self.write(value)
+
+    def last_success(self):
+        return self.read().get("ok") or None
+
+
+class Lease:
+    """账号级互斥：本机文件锁 + 可选的 GitHub 租约"""
+
+    def __init__(self, account, gh=GH_LEASE):
+        self.account = account
+        self.file = None
+        self.until = 0  # acquire 失败时：最早什么时候值得再试
+        self.gh = GitHubLease(account) if gh else None
+        if self.gh and not self.gh.ok:
+            self.gh = None
+
+    def acquire(self):
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        f = open(os.path.join(LOCK_DIR, f"{_key(self.account)}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            self.until = time.time() + LEASE_TTL  # 本机文件锁没有到期时间，按租约上限算
+            return False
+        self.file = f
+        try:
+            if self.gh and not self.gh.acquire():
+                self.release()
+                self.until = self.gh.until
+                return False
+        except Exception as e:
+            print(f"⚠️ GitHub 租约不可用: {e}")
+            self.gh = None
+        return True
+
+    def release(self, ok=False):
+        if self.gh and self.file:
+            try:
+                self.gh.release(ok)
+            except Exception as e:
+                print(f"⚠️ 释放 GitHub 租约失败: {e}")
+        if self.file:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+
+class Skipped:
+    """本次没有运行：until 之前不用再试（近期已成功 / 别的运行持有租约）"""
+
+    def __init__(self, until, reason):
+        self.until = until
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Skipped({self.until!r}, {self.reason!r})"
+
+
+def recent_success(account, ttl=SUCCESS_TTL, now=None):
+    """TTL 内最近一次成功的完整登录时间（本机历史 + GitHub 租约），没有则 None"""
+    if ttl <= 0:
+        return None
+    now = now or time.time()
+    times = []
+    try:
+        from history import History
+
+        h = History()
+        times.append(h.last_success(account, exclude=("probe", "api")))
+        h.close()
+    except Exception:
+        pass
+    if GH_LEASE:
+        try:
+            gh = GitHubLease(account)
+            if gh.ok:
+                times.append(gh.last_success())
+        except Exception:
+            pass
+    last = max([t for t in times if t] or [0])
+    return last if now - last < ttl * 3600 else None
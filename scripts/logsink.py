@@ -0,0 +1,150 @@
+"""
+结构化日志：每条一行 JSON（时间、级别、账号、阶段、距运行开始的秒数、内容），写到 .claw/logs/claw.jsonl
+- 登录线程只把记录放进有界队列，后台线程负责写文件，磁盘慢也不会卡住浏览器流程
+- 队列满时丢弃并计数（claw_log_dropped_total），不阻塞
+- 文件超过 CLAW_LOG_MAX_MB 时轮转为 claw.jsonl.1 ...，保留 CLAW_LOG_BACKUPS 份
+- CLAW_LOG_FILE 为空则不写文件
+
+用法: python logsink.py show [--account 账号] [--level ERROR] [-n 50]
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import threading
+
+import metrics
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+LOG_FILE = os.environ.get("CLAW_LOG_FILE", os.path.join(STATE_DIR, "logs", "claw.jsonl"))
+LOG_MAX_MB = float(os.environ.get("CLAW_LOG_MAX_MB", "10"))
+LOG_BACKUPS = int(os.environ.get("CLAW_LOG_BACKUPS", "5"))
+LOG_RING = int(os.environ.get("CLAW_LOG_RING", "200"))  # 每次运行内存里保留的行数
+QUEUE_SIZE = 10000
+
+
+class Sink:
+    """后台写 JSON 行的日志文件（每个进程一个，见 sink()）"""
+
+    def __init__(self, path=LOG_FILE, max_mb=LOG_MAX_MB, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.backups = backups
+        self.q = queue.Queue(QUEUE_SIZE)
+        self.dropped = 0
+        self.f = None
+        threading.Thread(target=self._loop, name="log-sink", daemon=True).start()
+
+    def emit(self, record):
+        """放进队列立即返回；队列满时丢弃"""
+        try:
+            self.q.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("claw_log_dropped_total")
+
+    def flush(self, timeout=5):
+        """等队列里已有的记录写完（运行结束时调用），返回是否写完"""
+        done = threading.Event()
+        try:
+            self.q.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _loop(self):
+        while True:
+            item = self.q.get()
+            batch = [item]
+            # 一次取完积压的记录，合并成一次写入
+            while len(batch) < 500:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [json.dumps(r, ensure_ascii=False) for r in batch if isinstance(r, dict)]
+            try:
+                if lines:
+                    self._write("\n".join(lines) + "\n")
+            except Exception as e:
+                print(f"写日志文件失败: {e}")
+                self.f = None
+            for r in batch:
+                if isinstance(r, threading.Event):
+                    r.set()
+
+    def _write(self, text):
+        if self.f is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.f = open(self.path, "a", encoding="utf-8")
+        self.f.write(text)
+        self.f.flush()
+        if self.f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.f.close()
+        self.f = None
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+_lock = threading.Lock()
+_sink = {}
+
+
+def sink():
+    """本进程的日志文件写入器；未配置 CLAW_LOG_FILE 时返回 None"""
+    if not LOG_FILE:
+        return None
+    with _lock:
+        if "sink" not in _sink:
+            _sink["sink"] = Sink()
+        return _sink["sink"]
+
+
+def record(level, msg, account="", stage="", elapsed=None, **extra):
+    """组装一条日志记录"""
+    r = {"ts": round(time.time(), 3), "level": level, "account": account or "", "stage": stage or ""}
+    if elapsed is not None:
+        r["elapsed"] = round(elapsed, 3)
+    r["msg"] = msg
+    r.update(extra)
+    return r
+
+
+def main(argv):
+    if argv[:1] != ["show"]:
+        print(__doc__)
+        return 1
+    args = dict(zip(argv[1::2], argv[2::2]))
+    account, level, n = args.get("--account"), args.get("--level"), int(args.get("-n", 50))
+    rows = []
+    for i in range(LOG_BACKUPS, -1, -1):
+        path = f"{LOG_FILE}.{i}" if i else LOG_FILE
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                if (account is None or r.get("account") == account) and (level is None or r.get("level") == level):
+                    rows.append(r)
+    for r in rows[-n:]:
+        t = time.strftime("%m-%d %H:%M:%S", time.localtime(r["ts"]))
+        el = f"+{r['elapsed']:.1f}s" if "elapsed" in r else ""
+        print(f"{t} {r['level']:<7} {r['account'] or '-':<20} {r['stage'] or '-':<10} {el:>8}  {r['msg']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
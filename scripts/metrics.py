@@ -0,0 +1,148 @@
+"""
+进程内指标 + /metrics、/healthz（Prometheus 文本格式，不依赖 prometheus_client）
+- CLAW_METRICS_LISTEN=127.0.0.1:9464 时 scheduler.py 启动 HTTP 服务；不配置则只在内存里计数
+- 计数在同一进程内累加（scheduler 在线程里跑 AutoLogin，浏览器登录的指标也能收集到）
+"""
+
+import os
+import time
+import threading
+
+METRICS_LISTEN = os.environ.get("CLAW_METRICS_LISTEN", "")
+BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)  # 秒
+
+# 名称 -> (类型, 说明)
+METRICS = {
+    "claw_runs_total": ("counter", "执行次数（按动作和结果）"),
+    "claw_stage_seconds": ("histogram", "各阶段耗时"),
+    "claw_next_run_timestamp_seconds": ("gauge", "各账号下次执行时间"),
+    "claw_browsers_active": ("gauge", "本进程正在运行的浏览器数"),
+    "claw_browsers_max": ("gauge", "本机浏览器上限"),
+    "claw_api_errors_total": ("counter", "外部 API 请求失败次数"),
+    "claw_tg_messages_total": ("counter", "Telegram 消息（按优先级和结果：sent / delayed / throttled / dropped / failed）"),
+    "claw_log_dropped_total": ("counter", "日志队列满时丢弃的记录数"),
+    "claw_scheduler_last_loop_timestamp_seconds": ("gauge", "调度循环最近一次运行时间"),
+    "process_resident_memory_bytes": ("gauge", "常驻内存"),
+}
+
+_lock = threading.Lock()
+_values = {}  # (名称, 标签) -> 值
+_hists = {}  # (名称, 标签) -> [各桶计数..., +Inf, sum]
+_health = {"ttl": None}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, n=1, **labels):
+    with _lock:
+        k = _key(name, labels)
+        _values[k] = _values.get(k, 0) + n
+
+
+def gauge(name, value, **labels):
+    with _lock:
+        _values[_key(name, labels)] = value
+
+
+def clear(name):
+    """清掉某个指标的全部标签组合（例如账号计划重新生成时）"""
+    with _lock:
+        for k in [k for k in _values if k[0] == name]:
+            del _values[k]
+
+
+def observe(name, value, **labels):
+    with _lock:
+        h = _hists.setdefault(_key(name, labels), [0] * (len(BUCKETS) + 2))
+        for i, b in enumerate(BUCKETS):
+            if value <= b:
+                h[i] += 1
+        h[-2] += 1
+        h[-1] += value
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    gauge("process_resident_memory_bytes", rss())
+    with _lock:
+        values = sorted(_values.items())
+        hists = sorted(_hists.items())
+    out = []
+    for name, (kind, doc) in METRICS.items():
+        out.append(f"# HELP {name} {doc}")
+        out.append(f"# TYPE {name} {kind}")
+        for (n, labels), v in values:
+            if n == name:
+                out.append(f"{name}{_labels(labels)} {v:.15g}")
+        for (n, labels), h in hists:
+            if n != name:
+                continue
+            for b, c in zip(BUCKETS, h):
+                out.append(f"{name}_bucket{_labels(labels, [('le', b)])} {c}")
+            out.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-2]}")
+            out.append(f"{name}_count{_labels(labels)} {h[-2]}")
+            out.append(f"{name}_sum{_labels(labels)} {h[-1]:.15g}")
+    return "\n".join(out) + "\n"
+
+
+def healthy(now=None):
+    """调度循环在 ttl 秒内运行过即健康（未设置 ttl 时总是健康）"""
+    ttl = _health["ttl"]
+    if not ttl:
+        return True
+    with _lock:
+        last = _values.get(_key("claw_scheduler_last_loop_timestamp_seconds", {}), 0)
+    return (now or time.time()) - last <= ttl
+
+
+def serve(listen=METRICS_LISTEN, ttl=None):
+    """后台启动 /metrics、/healthz；listen 为空则不启动"""
+    if not listen:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    _health["ttl"] = ttl
+    host, _, port = listen.rpartition(":")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                code, body, ctype = 200, render(), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/healthz":
+                ok = healthy()
+                code, body, ctype = (200 if ok else 503), ("ok\n" if ok else "stalled\n"), "text/plain"
+            else:
+                code, body, ctype = 404, "not found\n", "text/plain"
+            data = body.encode()
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 指标服务: http://{host or '127.0.0.1'}:{port}/metrics")
+    return server
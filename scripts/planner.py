@@ -0,0 +1,68 @@
+"""
+多账号错峰
+- spread：同时到期的任务均匀摊到 CLAW_SPREAD_MINUTES 窗口里，每个槽内再随机抖动
+- BrowserSlots：整台机器同时运行的 Chromium 不超过 CLAW_MAX_BROWSERS 个（文件锁，跨进程生效）
+"""
+
+import os
+import time
+import fcntl
+import random
+import tempfile
+from contextlib import contextmanager
+
+import metrics
+from clock import CLOCK
+
+SPREAD_MINUTES = float(os.environ.get("CLAW_SPREAD_MINUTES", "60"))
+MAX_BROWSERS = int(os.environ.get("CLAW_MAX_BROWSERS", "2"))
+SLOT_DIR = os.environ.get("CLAW_SLOT_DIR", os.path.join(tempfile.gettempdir(), "claw-browser-slots"))
+
+
+def spread(jobs, now=None, window=SPREAD_MINUTES * 60, rng=random):
+    """返回 {任务: 开始时间}；第一个立即开始，其余按槽位错开"""
+    now = now or time.time()
+    jobs = list(jobs)
+    rng.shuffle(jobs)
+    if not jobs:
+        return {}
+    slot = window / len(jobs)
+    return {job: now if i == 0 else now + i * slot + rng.uniform(0, slot) for i, job in enumerate(jobs)}
+
+
+class BrowserSlots:
+    """本机浏览器槽位（N 个锁文件，拿到任意一个即可启动）"""
+
+    def __init__(self, n=MAX_BROWSERS, path=SLOT_DIR, clock=CLOCK):
+        self.n = max(1, n)
+        self.path = path
+        self.clock = clock
+
+    @contextmanager
+    def acquire(self, poll=1.0, timeout=None):
+        """timeout 秒内没等到空闲槽位则抛 TimeoutError（None 为一直等）"""
+        os.makedirs(self.path, exist_ok=True)
+        end = None if timeout is None else self.clock.time() + timeout
+        waited = False
+        while True:
+            for i in range(self.n):
+                f = open(os.path.join(self.path, f"slot-{i}.lock"), "a")
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    f.close()
+                    continue
+                metrics.inc("claw_browsers_active")
+                try:
+                    yield i
+                finally:
+                    metrics.inc("claw_browsers_active", -1)
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                    f.close()
+                return
+            if end is not None and self.clock.time() >= end:
+                raise TimeoutError("等待浏览器槽位超时")
+            if not waited:
+                print(f"⏳ 本机已有 {self.n} 个浏览器在运行，等待空闲槽位...")
+                waited = True
+            self.clock.sleep(poll)
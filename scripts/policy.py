@@ -0,0 +1,146 @@
+"""
+保活策略：按会话到期时间和不活跃阈值，安排“最便宜、又来得及”的动作
+- probe：带 user_session 请求一次 GitHub，确认并续期 GitHub 会话（不开浏览器）
+- api：带 ClawCloud 令牌请求一次 CLAW_KEEPALIVE_API，算作一次 ClawCloud 活跃（不开浏览器）
+- login：完整浏览器登录
+
+截止时间（都提前 CLAW_MARGIN_HOURS 执行）：
+- GitHub user_session 到期            -> probe
+- ClawCloud 会话到期 / 不活跃阈值到期  -> api（需配置接口且令牌届时仍有效），否则 login
+probe / api 成功后 CLAW_RECHECK_HOURS 小时内不再做（续期没有推后到期时间时，否则会立刻又排一次），
+推迟后会话已经到期就改成 login
+"""
+
+import os
+import time
+import json
+import base64
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from vault import load_state, save_state
+from proxies import ProxyPool, requests_proxies
+
+CLAW_CLOUD_URL = os.environ.get("CLAW_CLOUD_URL", "https://eu-central-1.run.claw.cloud")
+REGION = urlparse(CLAW_CLOUD_URL).hostname.split(".")[0]
+INACTIVE_DAYS = float(os.environ.get("CLAW_INACTIVE_DAYS", "30"))  # ClawCloud 不活跃阈值
+MARGIN_HOURS = float(os.environ.get("CLAW_MARGIN_HOURS", "48"))  # 安全余量
+KEEPALIVE_API = os.environ.get("CLAW_KEEPALIVE_API", "")  # 例如 /api/xxx，不配置则不用 api 动作
+RECHECK_HOURS = float(os.environ.get("CLAW_RECHECK_HOURS", "6"))  # probe / api 的最小间隔
+
+ACT_PROBE = "probe"
+ACT_API = "api"
+ACT_LOGIN = "login"
+
+# earliest：抖动也不能早于这个时间（probe / api 的最小间隔）
+Decision = namedtuple("Decision", "action at reason earliest", defaults=(0,))
+
+
+def cookie_expiry(state, domain, name=None):
+    """某个域下（指定名称的）持久 Cookie 最早到期时间；没有则 None"""
+    exps = [c["expires"] for c in (state or {}).get("cookies", [])
+            if domain in c.get("domain", "") and (name is None or c["name"] == name)
+            and c.get("expires", -1) > 0]
+    return min(exps) if exps else None
+
+
+def claw_token(state):
+    """从 localStorage 里找 ClawCloud 的 JWT，返回 (令牌, 到期时间)"""
+    for origin in (state or {}).get("origins", []):
+        if "claw.cloud" not in origin.get("origin", ""):
+            continue
+        for item in origin.get("localStorage", []):
+            value = item.get("value", "").strip('"')
+            parts = value.split(".")
+            if len(parts) != 3:
+                continue
+            try:
+                payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+                return value, float(payload["exp"])
+            except Exception:
+                continue
+    return None, None
+
+
+def claw_expiry(state):
+    exps = [t for t in (cookie_expiry(state, "claw.cloud"), claw_token(state)[1]) if t]
+    return min(exps) if exps else None
+
+
+def plan(state, last_ok, now=None, last_check=None):
+    """纯函数：会话状态 + 最近成功时间（last_check：最近一次任意动作成功，含 probe / api）-> Decision"""
+    now = now or time.time()
+    margin = MARGIN_HOURS * 3600
+    if not last_ok:
+        return Decision(ACT_LOGIN, now, "从未成功")
+    if not state:
+        # 没有会话可以探测，只能按不活跃阈值定期完整登录
+        return Decision(ACT_LOGIN, max(now, last_ok + INACTIVE_DAYS * 86400 - margin), "没有保存的会话")
+
+    gh = cookie_expiry(state, "github.com", "user_session")
+    claw = claw_expiry(state)
+    deadlines = [(last_ok + INACTIVE_DAYS * 86400 - margin, "ClawCloud 不活跃阈值")]
+    if claw:
+        deadlines.append((claw - margin, "ClawCloud 会话到期"))
+    if gh:
+        deadlines.append((gh - margin, "GitHub 会话到期"))
+    at, reason = min(deadlines)
+    at = max(at, now)
+    # probe / api 刚成功过就等到 RECHECK_HOURS 之后；那时会话已经到期就直接 login
+    earliest = last_check + RECHECK_HOURS * 3600 if last_check else 0
+    cheap = max(at, earliest)
+
+    if reason == "GitHub 会话到期":
+        return Decision(ACT_PROBE, cheap, reason, earliest) if gh > cheap else Decision(ACT_LOGIN, at, reason)
+    if KEEPALIVE_API and claw and claw > cheap:
+        return Decision(ACT_API, cheap, reason, earliest)
+    return Decision(ACT_LOGIN, at, reason)
+
+
+def decide(account, history, now=None):
+    """读取保存的会话和运行历史，给出下一步（account 为空表示环境变量里的单账号）"""
+    name = account or os.environ.get("GH_USERNAME", "")
+    return plan(load_state(account), history.last_success(name), now, history.last_success(name, exclude=()))
+
+
+def _proxies(account):
+    """和浏览器登录走同一个出口代理"""
+    return requests_proxies(ProxyPool().assign(account or os.environ.get("GH_USERNAME", "")))
+
+
+def probe(account):
+    """带 user_session 访问 GitHub；有效则把续期后的 Cookie 写回"""
+    import requests
+
+    state = load_state(account)
+    s = requests.Session()
+    s.proxies = _proxies(account) or {}
+    for c in (state or {}).get("cookies", []):
+        if "github.com" in c.get("domain", ""):
+            s.cookies.set(c["name"], c["value"], domain=c["domain"], path=c.get("path", "/"))
+    r = s.get("https://github.com/settings/profile", allow_redirects=False, timeout=30)
+    if r.status_code != 200:
+        return False
+
+    # 续期后的 Cookie 合并回 storage_state
+    fresh = {(c.name, c.domain.lstrip(".")): c for c in s.cookies}
+    for c in state["cookies"]:
+        f = fresh.get((c["name"], c["domain"].lstrip(".")))
+        if f:
+            c["value"] = f.value
+            if f.expires:
+                c["expires"] = f.expires
+    save_state(account, state)
+    return True
+
+
+def api_keepalive(account):
+    """带 ClawCloud 令牌请求一次保活接口"""
+    import requests
+
+    token, exp = claw_token(load_state(account))
+    if not KEEPALIVE_API or not token or (exp and exp < time.time()):
+        return False
+    r = requests.get(f"{CLAW_CLOUD_URL}{KEEPALIVE_API}", headers={"Authorization": token},
+                     proxies=_proxies(account), timeout=30)
+    return 200 <= r.status_code < 300
@@ -0,0 +1,148 @@
+"""
+性能剖析（CLAW_PROFILE=1 开启）：判断慢在 Python、Playwright 通信还是页面本身
+- Python：cProfile（cpu.prof 可用 snakeviz 打开，cpu.txt 为累计耗时前 N 项）
+- 内存：tracemalloc，开始 / 结束快照的差异（alloc.txt），每次采样记录当前 / 峰值
+- Chromium：每次导航后通过 CDP 取 Performance.getMetrics（JS 堆、布局、脚本耗时等）
+每次运行打成一个 zip 放到 .claw/profiles/<账号>/，保留规则同失败现场（CLAW_PROFILE_KEEP）
+tracemalloc / cProfile 都是进程级的：scheduler 里同时有多个登录时只剖析先开始的那个，其余不剖析
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+from tracing import prune
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+PROFILE_DIR = os.environ.get("CLAW_PROFILE_DIR", os.path.join(STATE_DIR, "profiles"))
+PROFILE_ENABLED = os.environ.get("CLAW_PROFILE", "") == "1"
+PROFILE_KEEP = int(os.environ.get("CLAW_PROFILE_KEEP", "10"))
+PROFILE_BUDGET_MB = float(os.environ.get("CLAW_PROFILE_BUDGET_MB", "100"))
+TOP = 40
+
+# Performance.getMetrics 里关心的几项
+CDP_METRICS = (
+    "JSHeapUsedSize", "JSHeapTotalSize", "Nodes", "Documents", "JSEventListeners",
+    "LayoutCount", "RecalcStyleCount", "LayoutDuration", "RecalcStyleDuration",
+    "ScriptDuration", "TaskDuration",
+)
+
+_active = threading.Lock()  # 本进程正在剖析的运行
+
+
+class Profiler:
+    """一次运行的剖析数据；未开启时所有方法都是空操作"""
+
+    def __init__(self, account, enabled=PROFILE_ENABLED, root=PROFILE_DIR):
+        self.account = re.sub(r"[^\w.@-]", "_", account or "default")
+        self.enabled = enabled
+        self.root = root
+        self.cpu = None
+        self.snap = None
+        self.cdp = None
+        self.samples = []
+        self.started = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        import cProfile
+        import tracemalloc
+
+        if not _active.acquire(blocking=False):
+            print("⚠️ 本进程已有运行在做性能剖析，这次不剖析")
+            self.enabled = False
+            return
+        try:
+            self.started = time.time()
+            tracemalloc.start(25)
+            self.snap = tracemalloc.take_snapshot()
+            self.cpu = cProfile.Profile()
+            self.cpu.enable()
+        except Exception as e:
+            print(f"性能剖析启动失败: {e}")
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.enabled = False
+            self.cpu = None
+            _active.release()
+
+    def attach(self, context, page):
+        """给页面开一个 CDP 会话（只支持 Chromium）"""
+        if not self.enabled:
+            return
+        try:
+            self.cdp = context.new_cdp_session(page)
+            self.cdp.send("Performance.enable")
+        except Exception as e:
+            print(f"CDP 会话不可用: {e}")
+            self.cdp = None
+
+    def sample(self, label, url=""):
+        """导航完成后采样一次"""
+        if not self.enabled:
+            return
+        import tracemalloc
+
+        row = {"label": label, "url": url, "t": round(time.time() - self.started, 3)}
+        cur, peak = tracemalloc.get_traced_memory()
+        row["py_current"], row["py_peak"] = cur, peak
+        if self.cdp:
+            try:
+                m = {x["name"]: x["value"] for x in self.cdp.send("Performance.getMetrics")["metrics"]}
+                row.update({k: m[k] for k in CDP_METRICS if k in m})
+            except Exception:
+                pass
+        self.samples.append(row)
+
+    def finish(self, ok, timings=None):
+        """停止剖析并写出 zip，返回路径"""
+        if not self.enabled or not self.cpu:
+            return None
+        import io
+        import pstats
+        import zipfile
+        import tracemalloc
+
+        try:
+            self.cpu.disable()
+            end = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        finally:
+            self.enabled = False
+            _active.release()
+
+        tmp = tempfile.mkdtemp(prefix="claw-profile-")
+        try:
+            self.cpu.dump_stats(os.path.join(tmp, "cpu.prof"))
+            out = io.StringIO()
+            pstats.Stats(self.cpu, stream=out).sort_stats("cumulative").print_stats(TOP)
+            with open(os.path.join(tmp, "cpu.txt"), "w") as f:
+                f.write(out.getvalue())
+
+            with open(os.path.join(tmp, "alloc.txt"), "w") as f:
+                for stat in end.compare_to(self.snap, "lineno")[:TOP]:
+                    f.write(f"{stat}\n")
+
+            with open(os.path.join(tmp, "chromium.json"), "w") as f:
+                json.dump(self.samples, f, indent=2)
+
+            with open(os.path.join(tmp, "summary.json"), "w") as f:
+                json.dump({"account": self.account, "ok": ok, "started": self.started,
+                           "seconds": round(time.time() - self.started, 3),
+                           "timings": timings or {}}, f, indent=2, ensure_ascii=False)
+
+            dest = os.path.join(self.root, self.account)
+            os.makedirs(dest, exist_ok=True)
+            path = os.path.join(dest, f"{time.strftime('%Y%m%d-%H%M%S')}-profile.zip")
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+                for name in sorted(os.listdir(tmp)):
+                    z.write(os.path.join(tmp, name), name)
+            prune(self.root, PROFILE_KEEP, PROFILE_BUDGET_MB)
+            return path
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+HAR 录制 / 回放（离线、可复现的流程基准）
+- CLAW_HAR_RECORD=flow.har.zip   录制一次完整 AutoLogin.run()，结束后自动脱敏
+- CLAW_HAR_REPLAY=flow.har.zip   用 route_from_har 回放，不访问网络
+- CLAW_HAR_LATENCY=dsl           回放时按延迟档位给每个请求加延迟（见 LATENCY_PROFILES）
+
+脱敏：Cookie / Authorization / Set-Cookie 抹掉，用户名、密码、验证码、Session 换成占位符；
+回放时 AutoLogin 用同样的占位符提交表单，POST 才能和录制内容对上。
+
+用法：
+    python replay.py sanitize 原始.har.zip 脱敏.har.zip
+    python replay.py bench flow.har.zip [--runs 5] [--latency dsl]
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+from urllib.parse import quote_plus, urlparse
+
+HAR_RECORD = os.environ.get("CLAW_HAR_RECORD", "")
+HAR_REPLAY = os.environ.get("CLAW_HAR_REPLAY", "")
+HAR_LATENCY = os.environ.get("CLAW_HAR_LATENCY", "none")
+
+# 回放时使用的占位凭据
+PLACEHOLDERS = {
+    "username": "replay-user",
+    "password": "replay-password",
+    "session": "replay-session",
+    "code": "000000",
+}
+
+# 档位 -> {域名后缀: (基础毫秒, 抖动毫秒)}，"*" 为默认
+LATENCY_PROFILES = {
+    "none": {},
+    "lan": {"*": (5, 2)},
+    "dsl": {"*": (60, 20)},
+    "3g": {"*": (300, 100)},
+    "slow-github": {"*": (40, 10), "github.com": (800, 200)},
+}
+
+SECRET_HEADERS = ("cookie", "authorization", "x-csrf-token")
+OTP_FIELDS = re.compile(r"\b(app_otp|otp|sms_otp)=\d+")
+
+
+def _scrub_headers(headers):
+    for h in headers:
+        name = h.get("name", "").lower()
+        if name in SECRET_HEADERS:
+            h["value"] = "***"
+        elif name == "set-cookie":
+            # 只保留 cookie 名和属性
+            h["value"] = re.sub(r"^([^=]+)=[^;]*", r"\1=***", h.get("value", ""))
+
+
+def _replace(text, secrets):
+    for real, fake in secrets.items():
+        text = text.replace(real, fake).replace(quote_plus(real), quote_plus(fake))
+    return OTP_FIELDS.sub(lambda m: f"{m.group(1)}={PLACEHOLDERS['code']}", text)
+
+
+def _scrub_entry(e, secrets):
+    req, resp = e["request"], e["response"]
+    _scrub_headers(req.get("headers", []))
+    _scrub_headers(resp.get("headers", []))
+    req["cookies"], resp["cookies"] = [], []
+    post = req.get("postData")
+    if post:
+        if post.get("text"):
+            post["text"] = _replace(post["text"], secrets)
+        for p in post.get("params", []):
+            p["value"] = _replace(p.get("value", ""), secrets)
+
+
+def sanitize(src, dst, secrets):
+    """脱敏 HAR zip / Playwright trace zip；secrets 为 {明文: 占位符}。输出文件权限 0600"""
+    secrets = {k: v for k, v in secrets.items() if k}
+    fd, tmp = tempfile.mkstemp(suffix=".zip", dir=os.path.dirname(os.path.abspath(dst)))
+    os.close(fd)
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item)
+            if item.filename.endswith(".har"):
+                har = json.loads(data)
+                for e in har["log"]["entries"]:
+                    _scrub_entry(e, secrets)
+                data = json.dumps(har).encode()
+            elif item.filename.endswith(".network"):
+                # trace 里的网络记录：每行一个事件，resource-snapshot 的 snapshot 就是一条 HAR entry
+                lines = []
+                for line in data.decode().splitlines():
+                    ev = json.loads(line) if line.strip() else None
+                    if ev and ev.get("type") == "resource-snapshot" and "request" in ev.get("snapshot", {}):
+                        _scrub_entry(ev["snapshot"], secrets)
+                        line = json.dumps(ev)
+                    lines.append(line)
+                data = "\n".join(lines).encode()
+            try:
+                data = _replace(data.decode(), secrets).encode()
+            except UnicodeDecodeError:
+                pass  # 图片等二进制附件
+            zout.writestr(item, data)
+    os.replace(tmp, dst)
+
+
+class HarMode:
+    """录制 / 回放开关，挂到 browser context 上"""
+
+    def __init__(self, record=HAR_RECORD, replay=HAR_REPLAY, latency=HAR_LATENCY, seed=0):
+        if latency not in LATENCY_PROFILES:
+            raise ValueError(f"未知延迟档位: {latency}（可选 {', '.join(LATENCY_PROFILES)}）")
+        self.record = record
+        self.replay = replay
+        self.profile = LATENCY_PROFILES[latency]
+        self.seed = seed
+        self.seen = {}
+        self.tmp = None
+
+    @property
+    def replaying(self):
+        return bool(self.replay)
+
+    def context_options(self):
+        if not self.record:
+            return {}
+        self.tmp = tempfile.mkdtemp(prefix="claw-har-")
+        return {"record_har_path": os.path.join(self.tmp, "flow.har.zip"), "record_har_content": "attach"}
+
+    def attach(self, context):
+        """回放：HAR 兜底，延迟路由在前"""
+        if not self.replay:
+            return
+        context.route_from_har(self.replay, not_found="abort")
+        if self.profile:
+            context.route("**/*", self._delay)
+
+    def _delay(self, route):
+        req = route.request
+        host = urlparse(req.url).hostname or ""
+        base, jitter = next((v for k, v in self.profile.items() if k != "*" and host.endswith(k)),
+                            self.profile.get("*", (0, 0)))
+        # 每个请求按 (方法, URL, 第几次) 取固定随机数，并发顺序变化也能复现
+        key = (req.method, req.url)
+        self.seen[key] = self.seen.get(key, 0) + 1
+        rng = random.Random(f"{self.seed}:{req.method}:{req.url}:{self.seen[key]}")
+        ms = max(0.0, base + rng.uniform(-jitter, jitter))
+        if ms:
+            try:
+                req.frame.page.wait_for_timeout(ms)
+            except Exception:
+                pass
+        route.fallback()
+
+    def finish(self, context, secrets):
+        """录制：关闭 context 写出 HAR，再脱敏到目标路径"""
+        if not self.record or not self.tmp:
+            return None
+        try:
+            context.close()
+        except Exception:
+            pass
+        try:
+            sanitize(os.path.join(self.tmp, "flow.har.zip"), self.record, secrets)
+            return self.record
+        finally:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def bench(path, runs=5, latency="none"):
+    """回放 runs 次，统计各阶段耗时"""
+    from auto_login import AutoLogin
+    from history import percentile
+
+    samples, ok = {}, 0
+    for i in range(runs):
+        app = AutoLogin(har=HarMode(record="", replay=path, latency=latency))
+        try:
+            app.run()
+        except SystemExit:
+            pass
+        ok += app.ok
+        for stage, sec in app.timings.items():
+            samples.setdefault(stage, []).append(sec)
+
+    print(f"\n📊 回放 {path}  延迟档位 {latency}  成功 {ok}/{runs}")
+    print(f"  {'阶段':<24}{'min':>9}{'p50':>9}{'max':>9}")
+    for stage, vals in sorted(samples.items()):
+        vals.sort()
+        print(f"  {stage:<24}{vals[0]:>8.2f}s{percentile(vals, 50):>8.2f}s{vals[-1]:>8.2f}s")
+    return samples
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="HAR 录制 / 回放")
+    sub = ap.add_subparsers(dest="cmd")
+    sp = sub.add_parser("sanitize", help="脱敏已有的 HAR zip")
+    sp.add_argument("src")
+    sp.add_argument("dst")
+    bp = sub.add_parser("bench", help="离线回放基准")
+    bp.add_argument("har")
+    bp.add_argument("--runs", type=int, default=5)
+    bp.add_argument("--latency", default="none", choices=sorted(LATENCY_PROFILES))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "sanitize":
+        sanitize(args.src, args.dst, {
+            os.environ.get("GH_USERNAME", ""): PLACEHOLDERS["username"],
+            os.environ.get("GH_PASSWORD", ""): PLACEHOLDERS["password"],
+            os.environ.get("GH_SESSION", ""): PLACEHOLDERS["session"],
+        })
+    elif args.cmd == "bench":
+        bench(args.har, args.runs, args.latency)
+    else:
+        ap.print_help()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
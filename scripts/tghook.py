@@ -0,0 +1,266 @@
+"""
+Telegram 更新分发：一个进程里只有一个消费者（Webhook 或 getUpdates 长轮询），收到的更新广播给所有等待者
+- TG_WEBHOOK_URL：Telegram 推送的公网 https 地址（反向代理到本机 TG_WEBHOOK_LISTEN）
+- TG_WEBHOOK_LISTEN：本机监听地址，默认 127.0.0.1:8443
+- TG_WEBHOOK_SECRET：校验 X-Telegram-Bot-Api-Secret-Token 头
+收到更新立即唤醒等待中的 wait_code；没配置或 setWebhook 失败时回退到轮询。
+常驻进程（scheduler 的控制机器人）用 hub() 启动后台长轮询，同进程里的 wait_code 复用它，不再各自 getUpdates
+
+Webhook 和 getUpdates 对同一个机器人互斥（设了 Webhook 时 getUpdates 一律 409）：
+最后一个等验证码的使用方结束就 deleteWebhook（release，按使用方计数），常驻进程退出时删除（atexit）
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+
+import metrics
+
+WEBHOOK_URL = os.environ.get("TG_WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.environ.get("TG_WEBHOOK_LISTEN", "127.0.0.1:8443")
+WEBHOOK_SECRET = os.environ.get("TG_WEBHOOK_SECRET", "")
+KEEP = 100  # 内存里保留的最近更新数
+
+
+class Hub:
+    """最近的更新 + 条件变量，push 一条唤醒所有等待者"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.updates = []  # [(序号, update)]
+        self.seq = 0
+
+    def push(self, update):
+        with self.cond:
+            self.seq += 1
+            self.updates = (self.updates + [(self.seq, update)])[-KEEP:]
+            self.cond.notify_all()
+
+    def cursor(self):
+        """当前序号；wait(after=cursor) 只看之后到达的更新"""
+        with self.cond:
+            return self.seq
+
+    def read(self, after, timeout):
+        """序号大于 after 的更新 [(序号, update)]；没有就等到有或超时（返回空列表）"""
+        deadline = time.time() + timeout
+        with self.cond:
+            while True:
+                new = [(seq, upd) for seq, upd in self.updates if seq > after]
+                left = deadline - time.time()
+                if new or left <= 0:
+                    return new
+                self.cond.wait(left)
+
+    def wait(self, match, after, timeout):
+        """等到 match(update) 返回非空值；超时返回 None"""
+        deadline = time.time() + timeout
+        while True:
+            for seq, upd in self.read(after, max(0, deadline - time.time())):
+                after = seq
+                r = match(upd)
+                if r:
+                    return r
+            if time.time() >= deadline:
+                return None
+
+
+class Receiver(Hub):
+    """本机 HTTP 服务接收 Webhook 推送"""
+
+    def __init__(self, listen=WEBHOOK_LISTEN, secret=WEBHOOK_SECRET):
+        super().__init__()
+        host, _, port = listen.rpartition(":")
+        self.addr = (host or "127.0.0.1", int(port))
+        import secrets
+
+        self.secret = secret or secrets.token_urlsafe(24)
+        self.server = None
+        self.keep = False  # hub() 返回过：常驻进程在用，release() 不删除
+        self.users = 0  # 正在 wait_code 的使用方
+        self.api = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.headers.get("X-Telegram-Bot-Api-Secret-Token") != recv.secret:
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                    recv.push(json.loads(body))
+                except ValueError:
+                    pass
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.addr, Handler)
+        threading.Thread(target=self.server.serve_forever, name="tg-webhook", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+
+class Poller(Hub):
+    """后台线程 getUpdates 长轮询（常驻进程里唯一的消费者）"""
+
+    def __init__(self, token, api="https://api.telegram.org"):
+        super().__init__()
+        self.token = token
+        self.api = api
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, name="tg-poll", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _loop(self):
+        import requests
+
+        offset = None  # 第一次请求只取最后一条，跳过启动前的旧消息
+        while not self.stopped.is_set():
+            try:
+                if offset is None:
+                    r = requests.get(f"{self.api}/bot{self.token}/getUpdates", params={"offset": -1}, timeout=15)
+                    old = r.json().get("result") or []
+                    offset = old[-1]["update_id"] + 1 if old else 0
+                    continue
+                r = requests.get(f"{self.api}/bot{self.token}/getUpdates",
+                                 params={"timeout": 25, "offset": offset}, timeout=35)
+                data = r.json()
+                if not data.get("ok"):
+                    # 409：别处也在 getUpdates / 设了 Webhook
+                    metrics.inc("claw_api_errors_total", api="telegram")
+                    print(f"⚠️ getUpdates 失败: {data.get('description', r.status_code)}")
+                    self.stopped.wait(10)
+                    continue
+                for upd in data.get("result", []):
+                    offset = upd["update_id"] + 1
+                    self.push(upd)
+            except Exception:
+                metrics.inc("claw_api_errors_total", api="telegram")
+                self.stopped.wait(5)
+
+
+_lock = threading.Lock()  # 注册 / 删除 Webhook 的网络请求也在锁里做，setWebhook 和 deleteWebhook 不会交错
+_hooks = {}  # bot token -> Receiver / Poller / None（注册失败）
+
+
+def receiver(token, api="https://api.telegram.org", url=None, use=False):
+    """
+    本进程已有的消费者，或按需启动接收端并 setWebhook；未配置或失败返回 None，调用方改用轮询
+    use=True 时计为一个使用方（wait_code），用完必须调用 release()
+    """
+    if not token:
+        return None
+    url = WEBHOOK_URL if url is None else url
+    with _lock:
+        h = _hooks.get(token)
+        if h is None and url and token not in _hooks:
+            h = _hooks[token] = _register(token, api, url)
+        if use and isinstance(h, Receiver):
+            h.users += 1
+        return h
+
+
+def hub(token, api="https://api.telegram.org", url=None):
+    """常驻进程用：优先 Webhook，否则启动后台长轮询；同进程里的 receiver() 都返回它"""
+    if not token:
+        return None
+    h = receiver(token, api, url)
+    with _lock:
+        if h:
+            h.keep = True
+            return h
+        if not _hooks.get(token):
+            _hooks[token] = Poller(token, api).start()
+        return _hooks[token]
+
+
+def _register(token, api, url):
+    import requests
+
+    recv = None
+    try:
+        recv = Receiver(WEBHOOK_LISTEN, WEBHOOK_SECRET).start()
+        r = requests.post(f"{api}/bot{token}/setWebhook", timeout=15, data={
+            "url": url,
+            "secret_token": recv.secret,
+            "allowed_updates": json.dumps(["message"]),
+        })
+        if r.json().get("ok"):
+            print(f"✅ Telegram Webhook 已启用: {recv.addr[0]}:{recv.addr[1]}")
+            recv.api = api
+            if not _atexit:
+                # 留着的话之后所有 getUpdates 都是 409；整个进程只注册一次
+                atexit.register(_cleanup)
+                _atexit.append(True)
+            return recv
+        print(f"⚠️ setWebhook 失败，改用轮询: {r.text[:200]}")
+    except Exception as e:
+        print(f"⚠️ Telegram Webhook 启动失败，改用轮询: {e}")
+    if recv:
+        recv.stop()
+    return None
+
+
+def _delete(token, api):
+    import requests
+
+    try:
+        requests.post(f"{api}/bot{token}/deleteWebhook", timeout=15)
+        print("✅ Telegram Webhook 已删除")
+    except Exception as e:
+        metrics.inc("claw_api_errors_total", api="telegram")
+        print(f"⚠️ deleteWebhook 失败，getUpdates 会一直 409，请手动删除: {e}")
+
+
+def unregister(token, api="https://api.telegram.org"):
+    """停掉本进程的消费者；是 Webhook 就删除，恢复 getUpdates 可用"""
+    with _lock:
+        h = _hooks.pop(token, None)
+        if h:
+            h.stop()
+        if isinstance(h, Receiver):
+            _delete(token, api)
+
+
+def release(token, api="https://api.telegram.org"):
+    """receiver(use=True) 的使用方用完后调用：最后一个使用方走了、又不是 hub() 常驻在用的 Webhook 才删除"""
+    with _lock:
+        h = _hooks.get(token)
+        if not isinstance(h, Receiver):
+            return
+        h.users = max(0, h.users - 1)
+        if h.users or h.keep:
+            return
+        _hooks.pop(token)
+        h.stop()
+        _delete(token, api)
+
+
+_atexit = []
+
+
+def _cleanup():
+    for token, h in list(_hooks.items()):
+        if isinstance(h, Receiver):
+            unregister(token, h.api)
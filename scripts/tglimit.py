@@ -0,0 +1,196 @@
+"""
+Telegram 发送限流：令牌桶存在 SQLite 里，同机多个进程（配置 CLAW_FLEET_DB 时多台 VPS）共用
+- 两个桶：整个机器人（CLAW_TG_RATE 条/秒）和每个 chat（CLAW_TG_CHAT_RATE 条/秒）
+- 优先级：urgent（验证提示）可以把桶用空；normal / low 要给更高优先级留余量，并排在各自的发送线程里
+- 429：按 retry_after 暂停整个 chat（所有进程都等），然后重试；5xx / 网络错误也重试，其它 4xx（chat 不存在、参数错误等）不重试
+- 等太久的消息丢弃（各优先级的最长等待见 PRIORITIES）；延迟 / 丢弃都会打印、计入
+  claw_tg_messages_total，丢弃条数附在本进程下一条成功发出的文字消息后面
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import metrics
+from clock import CLOCK
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+LIMIT_DB = os.environ.get("CLAW_TG_LIMIT_DB") or os.environ.get("CLAW_FLEET_DB") \
+    or os.path.join(STATE_DIR, "tglimit.db")
+BOT_RATE = float(os.environ.get("CLAW_TG_RATE", "25"))  # 官方全局上限约 30 条/秒
+CHAT_RATE = float(os.environ.get("CLAW_TG_CHAT_RATE", "1"))  # 同一 chat 约 1 条/秒
+BOT_BURST = 25
+CHAT_BURST = 3
+RETRIES = 3
+DELAYED = 1.0  # 等待超过几秒算延迟
+
+# 优先级 -> (要给更高优先级留下的令牌数, 最长等待秒数)
+PRIORITIES = {
+    "urgent": (0, 120),  # 设备验证 / 两步验证 / 等验证码
+    "normal": (1, 300),  # 验证通过、Cookie、控制命令回复
+    "low": (2, 600),     # 运行结果汇总
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tg_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class Limiter:
+    """共享令牌桶（每次操作一个短连接，可跨线程使用）"""
+
+    def __init__(self, path=LIMIT_DB, clock=CLOCK):
+        self.path = path
+        self.clock = clock
+        self.dropped = 0  # 本进程丢弃了还没报告的条数
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, timeout=30)
+        db.executescript(SCHEMA)
+        db.close()
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _bucket(self, db, key, rate, burst, now):
+        row = db.execute("SELECT tokens, updated, blocked_until FROM tg_buckets WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return burst, 0.0
+        tokens, updated, blocked = row
+        return min(burst, tokens + max(0.0, now - updated) * rate), blocked
+
+    def _take(self, bot, chat, priority, now):
+        """能发就扣令牌返回 0，否则返回建议等待的秒数"""
+        reserve = PRIORITIES[priority][0]
+        buckets = [(f"bot:{bot}", BOT_RATE, BOT_BURST), (f"chat:{bot}:{chat}", CHAT_RATE, CHAT_BURST)]
+        with self._db() as db:
+            state = [(key, *self._bucket(db, key, rate, burst, now)) for key, rate, burst in buckets]
+            wait = 0.0
+            for (key, tokens, blocked), (_, rate, burst) in zip(state, buckets):
+                need = min(burst, 1 + reserve)
+                if blocked > now:
+                    wait = max(wait, blocked - now)
+                elif tokens < need:
+                    wait = max(wait, (need - tokens) / rate)
+            if wait:
+                return wait
+            for key, tokens, blocked in state:
+                db.execute("INSERT INTO tg_buckets (key, tokens, updated, blocked_until) VALUES (?, ?, ?, ?) "
+                           "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                           (key, tokens - 1, now, blocked))
+            return 0.0
+
+    def acquire(self, bot, chat, priority="normal"):
+        """等到可以发送，返回等了几秒；超过该优先级的最长等待返回 None（丢弃）"""
+        started = self.clock.time()
+        limit = PRIORITIES[priority][1]
+        while True:
+            now = self.clock.time()
+            wait = self._take(bot, chat, priority, now)
+            if not wait:
+                return now - started
+            if now - started + wait > limit:
+                return None
+            self.clock.sleep(min(wait, 5))
+
+    def backoff(self, bot, chat, seconds):
+        """收到 429：整个 chat 暂停 retry_after 秒"""
+        until = self.clock.time() + seconds
+        with self._db() as db:
+            db.execute("INSERT INTO tg_buckets (key, tokens, updated, blocked_until) VALUES (?, 0, ?, ?) "
+                       "ON CONFLICT (key) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+                       "blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                       (f"chat:{bot}:{chat}", self.clock.time(), until))
+
+    def take_dropped(self):
+        with self.lock:
+            n, self.dropped = self.dropped, 0
+            return n
+
+    def drop(self):
+        with self.lock:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_limiter = {}
+
+
+def limiter():
+    """本进程共用的限流器"""
+    with _lock:
+        if "limiter" not in _limiter:
+            _limiter["limiter"] = Limiter()
+        return _limiter["limiter"]
+
+
+def post(api, token, method, chat, data, files=None, priority="normal", hooks=None, timeout=30):
+    """
+    限流后调用 Bot API（sendMessage / sendPhoto），429 时按 retry_after 等待重试，5xx / 网络错误直接重试
+    返回是否发出；失败 / 丢弃都已计数并打印
+    """
+    import requests
+
+    lim = limiter()
+    bot = hashlib.sha1(token.encode()).hexdigest()[:12]  # 不把 token 写进数据库
+    what = method.replace("send", "").lower()
+    for attempt in range(RETRIES):
+        waited = lim.acquire(bot, chat, priority)
+        if waited is None:
+            lim.drop()
+            metrics.inc("claw_tg_messages_total", priority=priority, outcome="dropped")
+            print(f"⚠️ Telegram 限流：{priority} {what} 等待超过 {PRIORITIES[priority][1]} 秒，已丢弃")
+            return False
+        if waited > DELAYED:
+            metrics.inc("claw_tg_messages_total", priority=priority, outcome="delayed")
+            print(f"⏳ Telegram 限流：{priority} {what} 延迟 {waited:.1f} 秒")
+        payload = dict(data, chat_id=chat)
+        dropped = lim.take_dropped() if method == "sendMessage" else 0
+        if dropped:
+            payload["text"] = f"{payload.get('text', '')}\n\n⚠️ 此前有 {dropped} 条通知因限流被丢弃"
+        for f in (files or {}).values():
+            f.seek(0)
+        try:
+            r = requests.post(f"{api}/bot{token}/{method}", data=payload, files=files, hooks=hooks, timeout=timeout)
+        except Exception as e:
+            r = None
+            print(f"Telegram {what} 发送失败: {e}")
+        if r is not None and r.status_code == 429:
+            try:
+                retry = float(r.json().get("parameters", {}).get("retry_after", 5))
+            except ValueError:
+                retry = 5.0
+            lim.backoff(bot, chat, retry)
+            metrics.inc("claw_tg_messages_total", priority=priority, outcome="throttled")
+            print(f"⏳ Telegram 429：{retry:g} 秒后重试")
+        elif r is not None and r.status_code < 400:
+            metrics.inc("claw_tg_messages_total", priority=priority, outcome="sent")
+            return True
+        else:
+            metrics.inc("claw_api_errors_total", api="telegram")
+        if dropped:
+            with lim.lock:
+                lim.dropped += dropped  # 没发出去，下次再报
+        if r is not None and r.status_code < 500 and r.status_code != 429:
+            # 请求本身有问题，重试也一样
+            print(f"Telegram {what} 发送失败: {r.status_code} {r.text[:200]}")
+            break
+    metrics.inc("claw_tg_messages_total", priority=priority, outcome="failed")
+    return False
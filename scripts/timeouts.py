@@ -0,0 +1,129 @@
+"""
+自适应超时：按历史耗时给每个步骤定超时
+- 超时 = p99 × CLAW_TIMEOUT_FACTOR，限制在 [下限, 上限] 内
+- 样本不足 MIN_SAMPLES 时用默认值
+- 样本存在 .claw/timeouts.json，每个步骤保留最近 KEEP 个；超时 / 出错的等待不计入样本
+
+运行预算（Deadline）：整次运行共用一个截止时间，所有等待都从里面扣，
+并预留 CLAW_RUN_RESERVE 秒给保存状态和发通知；Actions 里从 job 开始计时（CLAW_JOB_STARTED）。
+"""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+
+from history import percentile
+from clock import CLOCK
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+STATS_FILE = os.environ.get("CLAW_TIMEOUT_STATS", os.path.join(STATE_DIR, "timeouts.json"))
+FACTOR = float(os.environ.get("CLAW_TIMEOUT_FACTOR", "3"))
+MIN_SAMPLES = 5
+KEEP = 50
+
+RUN_BUDGET = float(os.environ.get("CLAW_RUN_BUDGET", "900"))  # 整次运行的硬上限（秒）
+RUN_RESERVE = float(os.environ.get("CLAW_RUN_RESERVE", "60"))  # 留给保存状态和通知
+JOB_STARTED = float(os.environ.get("CLAW_JOB_STARTED") or 0)  # 预算起点，默认为进程启动
+
+# 步骤 -> (默认, 下限, 上限)，单位毫秒
+STEPS = {
+    "signin": (60000, 10000, 90000),     # 打开 ClawCloud 登录页
+    "load": (30000, 5000, 60000),        # 等页面加载
+    "nav": (60000, 15000, 120000),       # 两次导航之间
+    "click": (10000, 3000, 20000),       # 等按钮出现
+    "reload": (10000, 3000, 30000),      # 验证页刷新
+    "2fa_submit": (30000, 10000, 60000), # 提交验证码后跳转
+    "keepalive": (30000, 5000, 60000),   # 保活页面
+    "idle": (15000, 3000, 30000),        # 保活页 networkidle
+}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """整次运行的时间预算"""
+
+    def __init__(self, budget=RUN_BUDGET, reserve=RUN_RESERVE, started=None, clock=CLOCK):
+        self.clock = clock
+        self.end = (started or JOB_STARTED or clock.time()) + budget
+        self.reserve = reserve
+
+    def left(self):
+        """还能用来等待的秒数（已扣除预留）"""
+        return self.end - self.reserve - self.clock.time()
+
+    def hard_left(self):
+        """距离硬上限的秒数（收尾阶段用）"""
+        return max(0.0, self.end - self.clock.time())
+
+    def cap(self, seconds):
+        """把一次等待截到预算内；预算用尽直接抛 DeadlineExceeded"""
+        left = self.left()
+        if left <= 0:
+            raise DeadlineExceeded("运行时间预算用尽")
+        return min(seconds, left)
+
+
+class Timeouts:
+    """按步骤给出超时（不超过运行预算），并记录本次运行的耗时样本"""
+
+    def __init__(self, path=STATS_FILE, deadline=None, clock=CLOCK):
+        self.path = path
+        self.deadline = deadline
+        self.clock = clock
+        self.samples = {}
+        self.new = {}  # 本次运行新增样本
+        self.used = {}  # 本次运行实际使用的超时
+        try:
+            with open(path) as f:
+                self.samples = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, step):
+        """毫秒"""
+        default, lo, hi = STEPS[step]
+        vals = sorted(self.samples.get(step, []))
+        ms = default
+        if len(vals) >= MIN_SAMPLES:
+            ms = int(min(hi, max(lo, percentile(vals, 99) * 1000 * FACTOR)))
+        self.used[step] = ms
+        if self.deadline:
+            ms = int(self.deadline.cap(ms / 1000) * 1000)
+        return ms
+
+    @contextmanager
+    def measure(self, step):
+        """
+        with to.measure("signin") as ms: page.goto(url, timeout=ms)
+        只记正常完成的等待：超时 / 出错的耗时就是超时本身，记进去会把 p99 一路推到上限
+        """
+        t = self.clock.time()
+        yield self.get(step)
+        self.new.setdefault(step, []).append(round(self.clock.time() - t, 3))
+
+    def save(self):
+        """与文件里的最新内容合并后写回（多个进程可能同时写）"""
+        if not self.new:
+            return
+        try:
+            with open(self.path) as f:
+                merged = json.load(f)
+        except (OSError, ValueError):
+            merged = {}
+        for step, vals in self.new.items():
+            merged[step] = (merged.get(step, []) + vals)[-KEEP:]
+        d = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".timeouts-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(merged, f)
+        os.replace(tmp, self.path)
+        self.new = {}
+
+    def report(self):
+        """本次使用的超时，例如 "signin 12s, nav 30s" """
+        return ", ".join(f"{k} {v / 1000:g}s" for k, v in sorted(self.used.items()))
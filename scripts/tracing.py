@@ -0,0 +1,122 @@
+"""
+失败现场捕获：Playwright trace + HAR
+- CLAW_TRACE=1 开启；运行期间写到临时目录
+- 成功：直接丢弃；失败：压缩包脱敏后（同 replay.sanitize：Cookie / 密码 / 验证码 / Session）
+  以 0600 权限保存到 .claw/traces/<账号>/ 下；这个目录不进 Actions 缓存
+- 每个账号保留最近 CLAW_TRACE_KEEP 份，全部加起来不超过 CLAW_TRACE_BUDGET_MB
+"""
+
+import os
+import re
+import time
+import shutil
+import tempfile
+
+from replay import sanitize
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+TRACE_DIR = os.environ.get("CLAW_TRACE_DIR", os.path.join(STATE_DIR, "traces"))
+TRACE_ENABLED = os.environ.get("CLAW_TRACE", "") == "1"
+TRACE_KEEP = int(os.environ.get("CLAW_TRACE_KEEP", "5"))  # 每个账号保留几份
+TRACE_BUDGET_MB = float(os.environ.get("CLAW_TRACE_BUDGET_MB", "200"))  # 总磁盘预算
+
+
+class Capture:
+    """trace / HAR 捕获，只在失败时落盘"""
+
+    def __init__(self, account, enabled=TRACE_ENABLED, root=TRACE_DIR):
+        self.account = re.sub(r"[^\w.@-]", "_", account or "default")
+        self.enabled = enabled
+        self.root = root
+        self.tmp = tempfile.mkdtemp(prefix="claw-trace-") if enabled else None
+        self.saved = []
+        self.dest = None  # 失败时本次现场的目录和时间戳前缀
+        self.stamp = None
+
+    def context_options(self):
+        """new_context 的额外参数（HAR 以 zip 形式写出，内容作为附件压缩）"""
+        if not self.enabled:
+            return {}
+        return {"record_har_path": os.path.join(self.tmp, "network.har.zip")}
+
+    def start(self, context):
+        if self.enabled:
+            context.tracing.start(screenshots=True, snapshots=True)
+
+    def finish(self, context, failed, secrets=None):
+        """
+        停止捕获并关闭 context（HAR 在 close 时写出）；失败时脱敏保存，返回保存的文件列表
+        secrets: {明文: 占位符}，要在 context 关闭前准备好
+        """
+        if not self.enabled:
+            return []
+        trace = os.path.join(self.tmp, "trace.zip")
+        try:
+            if failed:
+                context.tracing.stop(path=trace)
+            else:
+                context.tracing.stop()
+        except Exception as e:
+            print(f"停止 trace 失败: {e}")
+        try:
+            context.close()
+        except Exception:
+            pass
+
+        try:
+            if failed:
+                dest = self.dest = os.path.join(self.root, self.account)
+                os.makedirs(dest, mode=0o700, exist_ok=True)
+                stamp = self.stamp = time.strftime("%Y%m%d-%H%M%S")
+                for name in os.listdir(self.tmp):
+                    target = os.path.join(dest, f"{stamp}-{name}")
+                    try:
+                        sanitize(os.path.join(self.tmp, name), target, secrets or {})
+                    except Exception as e:
+                        # 脱敏不了就不留，原始文件里有明文密码和 Cookie
+                        print(f"脱敏 {name} 失败，已丢弃: {e}")
+                        continue
+                    os.chmod(target, 0o600)
+                    self.saved.append(target)
+                prune(self.root)
+        finally:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+        return self.saved
+
+
+    def attach(self, path, name="network.har.zip"):
+        """失败时把别处已脱敏的文件（HAR 录制开着时的 HAR）放进本次现场；返回保存的文件列表"""
+        if not self.dest or not path:
+            return []
+        target = os.path.join(self.dest, f"{self.stamp}-{name}")
+        shutil.copyfile(path, target)
+        os.chmod(target, 0o600)
+        self.saved.append(target)
+        return [target]
+
+
+def prune(root=TRACE_DIR, keep=TRACE_KEEP, budget_mb=TRACE_BUDGET_MB):
+    """按账号保留最近 keep 次失败，再按总预算从最旧的开始删"""
+    runs = []  # (mtime, 大小, [文件])
+    for account in os.listdir(root) if os.path.isdir(root) else []:
+        d = os.path.join(root, account)
+        groups = {}
+        for name in os.listdir(d):
+            # 同一次失败的文件共用时间戳前缀
+            groups.setdefault(name[:15], []).append(os.path.join(d, name))
+        stamps = sorted(groups, reverse=True)
+        for i, stamp in enumerate(stamps):
+            files = groups[stamp]
+            if i >= keep:
+                for f in files:
+                    os.remove(f)
+                continue
+            runs.append((max(os.path.getmtime(f) for f in files), sum(os.path.getsize(f) for f in files), files))
+
+    total = sum(r[1] for r in runs)
+    for _, size, files in sorted(runs):
+        if total <= budget_mb * 1024 * 1024:
+            break
+        for f in files:
+            os.remove(f)
+        total -= size
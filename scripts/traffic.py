@@ -0,0 +1,122 @@
+"""
+流量统计：按阶段 + 域名统计请求数、发送 / 接收字节和缓存命中
+- 浏览器：CDP Network 事件（encodedDataLength 为实际收到的字节，含响应头；缓存命中不产生流量）
+- HTTP 客户端（Telegram / GitHub API / 预热）：requests 的 response hook
+"""
+
+import threading
+from urllib.parse import urlparse
+
+
+def _headers_size(headers):
+    return sum(len(k) + len(str(v)) + 4 for k, v in (headers or {}).items())
+
+
+class Traffic:
+    """一次运行的流量；stage 为当前阶段（AutoLogin.stage 维护）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stage = "other"
+        self.totals = {}  # (阶段, 域名) -> [请求, 缓存, 发送, 接收]
+        self.inflight = {}  # CDP requestId -> (阶段, 域名)
+
+    def add(self, stage, domain, requests=0, cached=0, sent=0, received=0):
+        with self.lock:
+            t = self.totals.setdefault((stage, domain or "-"), [0, 0, 0, 0])
+            t[0] += requests
+            t[1] += cached
+            t[2] += sent
+            t[3] += received
+
+    # ---------- 浏览器（CDP） ----------
+
+    def attach(self, context, page):
+        """在页面上开 CDP 会话并订阅 Network 事件（只支持 Chromium）"""
+        try:
+            cdp = context.new_cdp_session(page)
+            cdp.on("Network.requestWillBeSent", self._sent)
+            cdp.on("Network.requestServedFromCache", self._cached)
+            cdp.on("Network.responseReceived", self._response)
+            cdp.on("Network.loadingFinished", self._finished)
+            cdp.on("Network.loadingFailed", self._failed)
+            cdp.send("Network.enable")
+            return cdp
+        except Exception as e:
+            print(f"流量统计不可用: {e}")
+            return None
+
+    def _sent(self, ev):
+        req = ev.get("request", {})
+        rid = ev.get("requestId")
+        if rid in self.inflight:
+            # 重定向：同一个 requestId 复用，上一跳的字节在 redirectResponse 里
+            stage, domain = self.inflight[rid]
+            self.add(stage, domain, received=(ev.get("redirectResponse") or {}).get("encodedDataLength", 0))
+        domain = urlparse(req.get("url", "")).hostname
+        self.inflight[rid] = (self.stage, domain)
+        sent = len(req.get("method", "")) + len(req.get("url", "")) + _headers_size(req.get("headers"))
+        sent += len(req.get("postData") or "")
+        self.add(self.stage, domain, requests=1, sent=sent)
+
+    def _cached(self, ev):
+        stage, domain = self.inflight.get(ev.get("requestId"), (self.stage, None))
+        self.add(stage, domain, cached=1)
+
+    def _response(self, ev):
+        resp = ev.get("response", {})
+        if resp.get("fromDiskCache") or resp.get("fromPrefetchCache") or resp.get("fromServiceWorker"):
+            stage, domain = self.inflight.get(ev.get("requestId"), (self.stage, None))
+            self.add(stage, domain, cached=1)
+
+    def _finished(self, ev):
+        stage, domain = self.inflight.pop(ev.get("requestId"), (self.stage, None))
+        self.add(stage, domain, received=int(ev.get("encodedDataLength") or 0))
+
+    def _failed(self, ev):
+        self.inflight.pop(ev.get("requestId"), None)
+
+    # ---------- HTTP 客户端 ----------
+
+    def hooks(self, stage):
+        """requests 的 hooks 参数，例如 requests.get(url, hooks=traffic.hooks("telegram"))"""
+        def hook(r, *args, **kwargs):
+            req = r.request
+            body = req.body or b""
+            sent = len(req.method or "") + len(req.url or "") + _headers_size(req.headers) + len(body)
+            received = _headers_size(r.headers) + int(r.headers.get("content-length") or len(r.content or b""))
+            self.add(stage, urlparse(r.url).hostname, requests=1, sent=sent, received=received)
+        return {"response": hook}
+
+    # ---------- 汇总 ----------
+
+    def rows(self):
+        """[(阶段, 域名, 请求, 缓存, 发送, 接收)]，按接收字节降序"""
+        with self.lock:
+            rows = [(s, d, *v) for (s, d), v in self.totals.items()]
+        return sorted(rows, key=lambda r: -r[5])
+
+    def total(self):
+        """(请求, 缓存, 发送, 接收)"""
+        t = [0, 0, 0, 0]
+        for row in self.rows():
+            for i in range(4):
+                t[i] += row[2 + i]
+        return tuple(t)
+
+    def summary(self, top=3):
+        """一行摘要，例如 "86 请求 / 1.2 MB（缓存 12）；github.com 640 KB, ..." """
+        reqs, cached, sent, received = self.total()
+        by_domain = {}
+        for _, domain, _, _, s, r in self.rows():
+            by_domain[domain] = by_domain.get(domain, 0) + s + r
+        doms = ", ".join(f"{d} {human(b)}" for d, b in sorted(by_domain.items(), key=lambda x: -x[1])[:top])
+        return f"{reqs} 请求 / 收 {human(received)} 发 {human(sent)}（缓存 {cached}）；{doms}"
+
+
+def human(n):
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+多账号加密保险箱
+- 每个账号一条记录：用户名 / 密码 / TOTP 种子 / Cookie / storage_state
+- PyNaCl SecretBox 逐条加密，按账号索引随机读取，不用整份解密
+- 写入走临时文件 + os.replace，读者永远看到完整文件
+
+文件格式：
+    CLAWVLT1\n
+    {"names": <加密的账号列表>, "index": {<账号哈希>: [偏移, 长度]}}\n
+    <逐条加密的记录...>
+
+用法：
+    python vault.py keygen                 # 生成 CLAW_VAULT_KEY
+    python vault.py set <账号>             # 交互输入密码等（或从 GH_* 环境变量读取）
+    python vault.py list | get <账号> | rm <账号>
+"""
+
+import os
+import sys
+import json
+import base64
+import fcntl
+import tempfile
+
+STATE_DIR = os.environ.get("CLAW_STATE_DIR", ".claw")
+VAULT_FILE = os.environ.get("CLAW_VAULT", os.path.join(STATE_DIR, "vault.bin"))
+STORAGE_STATE = os.environ.get("CLAW_STORAGE_STATE", "")  # 单账号：storage_state 存到这个文件（例如 state.json）
+MAGIC = b"CLAWVLT1\n"
+
+# 记录里允许的字段
+FIELDS = ("username", "password", "totp", "cookies", "storage_state")
+
+
+class VaultError(Exception):
+    pass
+
+
+class Vault:
+    """加密保险箱（读多写少；索引常驻内存，文件变了才重新读头部）"""
+
+    def __init__(self, path=VAULT_FILE, key=None):
+        from nacl import secret
+
+        key = key or os.environ.get("CLAW_VAULT_KEY", "")
+        if not key:
+            raise VaultError("缺少 CLAW_VAULT_KEY")
+        self.path = path
+        self.key = base64.b64decode(key)
+        self.box = secret.SecretBox(self.key)
+        self.stamp = None
+        self.names = []
+        self.index = {}
+        self.body = 0  # 记录区起始偏移
+
+    def _hash(self, account):
+        from nacl.hash import blake2b
+        from nacl.encoding import HexEncoder
+        return blake2b(account.encode(), key=self.key, encoder=HexEncoder).decode()
+
+    def _load(self):
+        """文件变了（inode / mtime）才重新解析头部"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.stamp, self.names, self.index, self.body = None, [], {}, 0
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self.stamp:
+            return
+        with open(self.path, "rb") as f:
+            self._read_header(f)
+        self.stamp = stamp
+
+    def _read_header(self, f):
+        if f.readline() != MAGIC:
+            raise VaultError(f"不是保险箱文件: {self.path}")
+        head = json.loads(f.readline())
+        self.body = f.tell()
+        self.index = {k: tuple(v) for k, v in head["index"].items()}
+        self.names = json.loads(self.box.decrypt(base64.b64decode(head["names"]))) if head["names"] else []
+
+    def accounts(self):
+        self._load()
+        return list(self.names)
+
+    def get(self, account):
+        """读取单个账号，不存在返回 None"""
+        self._load()
+        pos = self.index.get(self._hash(account))
+        if not pos:
+            return None
+        with open(self.path, "rb") as f:
+            # 打开后文件可能已被替换：以打开的这份为准
+            if os.fstat(f.fileno()).st_ino != self.stamp[0]:
+                self._read_header(f)
+                pos = self.index.get(self._hash(account))
+                if not pos:
+                    return None
+            f.seek(self.body + pos[0])
+            return json.loads(self.box.decrypt(f.read(pos[1])))
+
+    def put(self, account, record):
+        """整条覆盖"""
+        self._write({account: record})
+
+    def update(self, account, **fields):
+        """只改部分字段（例如登录成功后写回 Cookie）"""
+        self._write({account: fields}, merge=True)
+
+    def delete(self, account):
+        self._write({account: None})
+
+    def _write(self, changes, merge=False):
+        d = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(d, exist_ok=True)
+        # 写者之间互斥；读者不加锁
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.stamp = None
+            self._load()
+
+            records = {}
+            if self.stamp:
+                with open(self.path, "rb") as f:
+                    for name in self.names:
+                        off, n = self.index[self._hash(name)]
+                        f.seek(self.body + off)
+                        records[name] = f.read(n)
+
+            for account, rec in changes.items():
+                if rec is None:
+                    records.pop(account, None)
+                    continue
+                rec = {k: v for k, v in rec.items() if k in FIELDS}
+                if merge and account in records:
+                    old = json.loads(self.box.decrypt(records[account]))
+                    old.update(rec)
+                    rec = old
+                records[account] = self.box.encrypt(json.dumps(rec).encode())
+
+            names = sorted(records)
+            index, blobs, off = {}, [], 0
+            for name in names:
+                index[self._hash(name)] = [off, len(records[name])]
+                blobs.append(records[name])
+                off += len(records[name])
+            head = {
+                "names": base64.b64encode(self.box.encrypt(json.dumps(names).encode())).decode() if names else "",
+                "index": index,
+            }
+
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".vault-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(MAGIC)
+                    f.write(json.dumps(head).encode() + b"\n")
+                    for b in blobs:
+                        f.write(b)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp, 0o600)
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self.stamp = None
+
+
+def load_state(account=""):
+    """读取会话状态：有账号走保险箱，否则读 CLAW_STORAGE_STATE 文件"""
+    if account:
+        return (Vault().get(account) or {}).get("storage_state")
+    if STORAGE_STATE and os.path.exists(STORAGE_STATE):
+        with open(STORAGE_STATE) as f:
+            return json.load(f)
+    return None
+
+
+def save_state(account, state):
+    """写回会话状态（文件同样先写临时文件再替换）"""
+    if account:
+        Vault().update(account, cookies=state.get("cookies", []), storage_state=state)
+        return
+    if not STORAGE_STATE:
+        return
+    d = os.path.dirname(os.path.abspath(STORAGE_STATE))
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".state-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, STORAGE_STATE)
+
+
+def main(argv):
+    if not argv or argv[0] not in ("keygen", "set", "get", "list", "rm"):
+        print(__doc__)
+        return 1
+
+    cmd = argv[0]
+    if cmd == "keygen":
+        from nacl import secret, utils
+        print(base64.b64encode(utils.random(secret.SecretBox.KEY_SIZE)).decode())
+        return 0
+
+    v = Vault()
+    if cmd == "list":
+        for name in v.accounts():
+            print(name)
+    elif len(argv) < 2:
+        print("缺少账号")
+        return 1
+    elif cmd == "get":
+        rec = v.get(argv[1]) or {}
+        # 不打印明文密码
+        print(json.dumps({k: ("***" if k in ("password", "totp") and rec[k] else rec[k]) for k in rec},
+                         ensure_ascii=False, indent=2)[:2000])
+    elif cmd == "rm":
+        v.delete(argv[1])
+        print(f"✅ 已删除 {argv[1]}")
+    else:
+        import getpass
+        rec = {
+            "username": os.environ.get("GH_USERNAME") or input("GitHub 用户名: ").strip(),
+            "password": os.environ.get("GH_PASSWORD") or getpass.getpass("GitHub 密码: "),
+            "totp": os.environ["GH_TOTP_SECRET"] if "GH_TOTP_SECRET" in os.environ
+            else getpass.getpass("TOTP 种子（可空）: ").strip(),
+        }
+        if os.environ.get("GH_SESSION"):
+            rec["cookies"] = [{"name": "user_session", "value": os.environ["GH_SESSION"],
+                               "domain": "github.com", "path": "/"}]
+        v.update(argv[1], **rec)
+        print(f"✅ 已保存 {argv[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))